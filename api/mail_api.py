@@ -1,6 +1,6 @@
-import smtplib
+from email.message import EmailMessage
 
-from fastapi import HTTPException
+from api.smtp_pool import SmtpPool
 from models.contact_form import ContactForm
 from settings import settings
 
@@ -13,42 +13,64 @@ class MailApi:
         self.noreply_email = settings.NOREPLY_EMAIL
         self.noreply_password = settings.NOREPLY_PASSWORD
 
-    async def send_email(self, contact_form: ContactForm):
-        try:
-            message = "Subject: New Contact Us Message\n\n"
-            message += f"Name: {contact_form.name}\n"
-            message += f"Email: {contact_form.email}\n"
-            message += f"Message:\n{contact_form.message}"
-
-            with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(self.sender_email, self.password)
-                server.sendmail(self.sender_email,
-                                self.receiver_email, message)
-
-            return {"message": "Email sent successfully"}
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail="Failed to send email") from e
-
-    # TODO: Finish implementing this method
-    async def send_payment_confirmation(self, formData):
-        email = formData['email']
-        amount = formData['amount']
-        try:
-            message = "Subject: Payment Confirmation\n\n"
-            message += f"Thank you for your payment of KES {amount}."
-            message += "We have received your payment and will process your order shortly."
-
-            with smtplib.SMTP(settings.ICT_SMTP_SERVER, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(self.noreply_email, self.password)
-                server.sendmail(self.noreply_email, email, message)
-
-            return {"message": "Email sent successfully"}
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail="Failed to send email") from e
+        pool_options = {
+            'port': settings.SMTP_PORT,
+            'size': settings.SMTP_POOL_SIZE,
+            'start_tls': settings.SMTP_STARTTLS,
+            'timeout': settings.SMTP_TIMEOUT,
+            'max_idle': settings.SMTP_MAX_IDLE_SECONDS,
+        }
+        self.contact_pool = SmtpPool(
+            settings.SMTP_SERVER,
+            username=self.sender_email if settings.SMTP_LOGIN else None,
+            password=self.password if settings.SMTP_LOGIN else None,
+            **pool_options
+        )
+        self.noreply_pool = SmtpPool(
+            settings.ICT_SMTP_SERVER,
+            username=self.noreply_email if settings.SMTP_LOGIN else None,
+            password=self.noreply_password if settings.SMTP_LOGIN else None,
+            **pool_options
+        )
+
+    def build_contact_message(self, contact_form: ContactForm) -> EmailMessage:
+        message = EmailMessage()
+        message['Subject'] = "New Contact Us Message"
+        message['From'] = self.sender_email
+        message['To'] = self.receiver_email
+        message.set_content(
+            f"Name: {contact_form.name}\n"
+            f"Email: {contact_form.email}\n"
+            f"Message:\n{contact_form.message}"
+        )
+        return message
+
+    def build_payment_confirmation(self, formData) -> EmailMessage:
+        message = EmailMessage()
+        message['Subject'] = "Payment Confirmation"
+        message['From'] = self.noreply_email
+        message['To'] = formData['email']
+        message.set_content(
+            f"Thank you for your payment of KES {formData['amount']}."
+            "We have received your payment and will process your order shortly."
+        )
+        return message
+
+    def pool_for(self, sender: str) -> SmtpPool:
+        return {
+            'contact': self.contact_pool,
+            'noreply': self.noreply_pool,
+        }[sender]
+
+    async def close(self):
+        await self.contact_pool.close()
+        await self.noreply_pool.close()
+
+    def stats(self) -> dict:
+        return {
+            'contact': self.contact_pool.stats(),
+            'noreply': self.noreply_pool.stats(),
+        }
 
 
 mail_api = MailApi()
@@ -1,6 +1,14 @@
-import httpx
+import asyncio
+
+from api.resilience import CircuitBreaker, ResilientCaller, RetryBudget
+from cache.ttl_lru import TTLCache
 from settings import settings
 
+# Transaction statuses Paystack will not change again for a reference; their
+# verification results are cached. 'abandoned' is not one of them: the
+# customer can still complete the payment on the same reference.
+FINAL_STATUSES = {'success', 'failed', 'reversed'}
+
 
 class PaystackApi:
     def __init__(self):
@@ -9,25 +17,115 @@ class PaystackApi:
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}'
         }
+        self._client = None
+        self._verifying = {}  # reference -> in-flight verification task
+        self._verified = TTLCache(settings.PAYSTACK_VERIFY_CACHE_MAX_ENTRIES, settings.PAYSTACK_VERIFY_CACHE_TTL)
+        self._stats = {'verify_calls': 0, 'verify_upstream': 0, 'verify_coalesced': 0}
+        self.resilience = ResilientCaller(
+            attempt_timeout=settings.PAYSTACK_ATTEMPT_TIMEOUT,
+            deadline=settings.PAYSTACK_DEADLINE,
+            max_retries=settings.PAYSTACK_MAX_RETRIES,
+            backoff_base=settings.PAYSTACK_RETRY_BACKOFF_BASE,
+            backoff_max=settings.PAYSTACK_RETRY_BACKOFF_MAX,
+            budget=RetryBudget(settings.PAYSTACK_RETRY_BUDGET_RATIO, settings.PAYSTACK_RETRY_BUDGET_MIN_PER_SECOND),
+            breaker=CircuitBreaker(settings.PAYSTACK_BREAKER_FAILURE_THRESHOLD,
+                                   settings.PAYSTACK_BREAKER_RESET_TIMEOUT),
+        )
 
-    async def initialize_payment(self, payment_details):
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f'{self.base_url}/transaction/initialize',
-                json=payment_details,
-                headers=self.headers
-            )
+    def _create_client(self):
+        # httpx (with httpcore and h2) is a large share of import time, so it
+        # is only loaded once a client is needed.
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=settings.PAYSTACK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PAYSTACK_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PAYSTACK_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.PAYSTACK_READ_TIMEOUT,
+            connect=settings.PAYSTACK_CONNECT_TIMEOUT,
+        )
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            limits=limits,
+            timeout=timeout,
+            http2=settings.PAYSTACK_HTTP2,
+        )
+
+    async def open(self):
+        """Create the shared client. Called once from the app lifespan."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self):
+        # Scripts that never run the app lifespan still get a pooled client.
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def _request(self, method, url, idempotent=True, **kwargs):
+        """Send a request through the deadline/retry/breaker layer and return its JSON."""
+        async def attempt():
+            response = await self.client.request(method, url, **kwargs)
             response.raise_for_status()
             return response.json()
 
+        return await self.resilience.call(attempt, idempotent=idempotent)
+
+    async def initialize_payment(self, payment_details):
+        # Not idempotent: a retry could open a second transaction, so only
+        # requests that never reached Paystack are retried.
+        return await self._request('POST', '/transaction/initialize', idempotent=False, json=payment_details)
+
     async def verify_payment(self, payment_reference):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f'{self.base_url}/transaction/verify/{payment_reference}',
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+        """Verify a transaction, sharing upstream calls between callers.
+
+        Concurrent calls for the same reference wait on one request to
+        Paystack, and results in a final status are served from cache
+        afterwards. The returned dict is shared, so callers must not modify it.
+        """
+        self._stats['verify_calls'] += 1
+        cached = self._verified.get(payment_reference)
+        if cached is not None:
+            return cached
+
+        task = self._verifying.get(payment_reference)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_verification(payment_reference))
+            self._verifying[payment_reference] = task
+            task.add_done_callback(lambda done: self._verification_done(payment_reference, done))
+        else:
+            self._stats['verify_coalesced'] += 1
+        # shield: one caller giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _fetch_verification(self, payment_reference):
+        self._stats['verify_upstream'] += 1
+        result = await self._request('GET', f'/transaction/verify/{payment_reference}')
+        if (result.get('data') or {}).get('status') in FINAL_STATUSES:
+            self._verified.set(payment_reference, result)
+        return result
+
+    def _verification_done(self, payment_reference, task):
+        self._verifying.pop(payment_reference, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            'verify_in_flight': len(self._verifying),
+            'verify_cache': self._verified.stats(),
+            'resilience': self.resilience.stats(),
+        }
 
 
 paystack_api = PaystackApi()
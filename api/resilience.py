@@ -0,0 +1,192 @@
+"""Deadlines, retries and a circuit breaker for outbound HTTP calls.
+
+Used by :class:`api.paystack_api.PaystackApi`, so a slow or failing
+Paystack costs each request a bounded amount of time instead of holding a
+worker until the socket gives up:
+
+- every attempt runs under a deadline, and so does the call as a whole,
+  retries included;
+- failed attempts are retried with full-jitter exponential backoff, but
+  only while the retry budget allows it. Retries can then add at most
+  ``ratio`` extra load on top of normal traffic, so an outage is not
+  amplified by everyone retrying at once;
+- after ``failure_threshold`` consecutive failures the breaker opens and
+  calls fail immediately with :class:`CircuitOpenError`. After
+  ``reset_timeout`` one probe call is let through: success closes the
+  breaker, failure opens it again.
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar('T')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream the breaker considers down."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are worth retrying; other errors are not."""
+    import httpx
+
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+def is_unsent(error: BaseException) -> bool:
+    """True if the request never reached the server, so even a POST is safe to retry."""
+    import httpx
+
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+class RetryBudget:
+    """Caps retries at a fraction of recent calls.
+
+    Every call deposits ``ratio`` tokens and every retry spends one. On
+    top of that ``min_per_second`` tokens accrue over time, so a quiet
+    service can still retry now and then. The balance is capped at
+    ``max_tokens``, so quiet periods do not bank up a burst.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._stats = {'retries': 0, 'exhausted': 0}
+
+    def _refill(self, amount: float = 0.0):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens,
+                           self._tokens + amount + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        self._refill(self.ratio)
+
+    def try_withdraw(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self._stats['retries'] += 1
+            return True
+        self._stats['exhausted'] += 1
+        return False
+
+    def stats(self) -> dict:
+        self._refill()
+        return {**self._stats, 'tokens': round(self._tokens, 2)}
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self._stats['rejected'] += 1
+                raise CircuitOpenError("Circuit open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self._stats['rejected'] += 1
+                raise CircuitOpenError("Circuit half-open, probe in flight")
+            self._probing = True
+
+    def record_success(self):
+        self._failures = 0
+        self._probing = False
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self._stats['opened'] += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def record_ignored(self):
+        """The call ended without telling us anything about upstream health."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {**self._stats, 'state': self.state, 'consecutive_failures': self._failures}
+
+
+class ResilientCaller:
+    """Applies deadlines, budgeted retries and a breaker to calls to one upstream."""
+
+    def __init__(self, attempt_timeout: float, deadline: float, max_retries: int,
+                 backoff_base: float, backoff_max: float,
+                 budget: RetryBudget, breaker: CircuitBreaker):
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget
+        self.breaker = breaker
+        self._stats = {'calls': 0, 'failures': 0, 'timeouts': 0}
+
+    async def call(self, attempt: Callable[[], Awaitable[T]], idempotent: bool = True) -> T:
+        """Run ``attempt()`` until it succeeds, or raise its last error.
+
+        A non-idempotent call is only retried when the request never left
+        this process (connection errors), as the server may otherwise have
+        acted on it already.
+        """
+        self._stats['calls'] += 1
+        self.budget.deposit()
+        give_up_at = time.monotonic() + self.deadline
+        retries = 0
+        while True:
+            self.breaker.before_call()
+            remaining = give_up_at - time.monotonic()
+            try:
+                result = await asyncio.wait_for(attempt(), min(self.attempt_timeout, remaining))
+            except asyncio.CancelledError:
+                self.breaker.record_ignored()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success()  # upstream answered; the request was at fault
+                    raise
+                self.breaker.record_failure()
+                self._stats['failures'] += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    self._stats['timeouts'] += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retries))
+                if (retries >= self.max_retries
+                        or (not idempotent and not is_unsent(e))
+                        or time.monotonic() + delay >= give_up_at
+                        or not self.budget.try_withdraw()):
+                    raise
+                retries += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> dict:
+        return {**self._stats, 'breaker': self.breaker.stats(), 'retry_budget': self.budget.stats()}
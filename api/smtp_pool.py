@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+
+import aiosmtplib
+
+
+class SmtpPool:
+    """A small pool of authenticated aiosmtplib connections to one server.
+
+    Connections are opened lazily, reused across sends and dropped once they
+    have been idle for longer than ``max_idle`` or the server hangs up.
+    """
+
+    def __init__(self, hostname: str, port: int, username: str = None, password: str = None,
+                 size: int = 2, start_tls: bool = True, timeout: float = 10.0, max_idle: float = 60.0):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.max_idle = max_idle
+
+        self._slots = None  # created on first use, inside the running loop
+        self._idle = []  # (connection, last_used)
+        self._stats = {
+            'sent': 0,
+            'failed': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'last_latency_ms': None,
+            'total_latency_ms': 0.0,
+        }
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        connection = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await connection.connect()
+        self._stats['connects'] += 1
+        return connection
+
+    @staticmethod
+    async def _quit(connection: aiosmtplib.SMTP):
+        try:
+            if connection.is_connected:
+                await connection.quit()
+        except aiosmtplib.SMTPException:
+            connection.close()
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            connection, last_used = self._idle.pop()
+            if connection.is_connected and time.monotonic() - last_used < self.max_idle:
+                return connection
+            await self._quit(connection)
+        return await self._connect()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection for the duration of the block.
+
+        Used directly by callers that want to send several messages over a
+        single session.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            connection = await self._checkout()
+            try:
+                yield connection
+            except Exception:
+                await self._quit(connection)
+                raise
+            else:
+                if connection.is_connected:
+                    self._idle.append((connection, time.monotonic()))
+
+    async def send(self, message: EmailMessage, connection: aiosmtplib.SMTP = None):
+        """Send one message, reconnecting once if the server dropped us."""
+        if connection is None:
+            async with self.connection() as connection:
+                return await self.send(message, connection)
+
+        started = time.perf_counter()
+        try:
+            try:
+                response = await connection.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                self._stats['reconnects'] += 1
+                await connection.connect()
+                response = await connection.send_message(message)
+        except Exception:
+            self._stats['failed'] += 1
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._stats['sent'] += 1
+        self._stats['last_latency_ms'] = round(latency_ms, 2)
+        self._stats['total_latency_ms'] += latency_ms
+        logging.info(f"Sent email via {self.hostname} in {latency_ms:.1f} ms")
+        return response
+
+    async def close(self):
+        while self._idle:
+            connection, _ = self._idle.pop()
+            await self._quit(connection)
+
+    def stats(self) -> dict:
+        sent = self._stats['sent']
+        return {
+            **{key: value for key, value in self._stats.items() if key != 'total_latency_ms'},
+            'avg_latency_ms': round(self._stats['total_latency_ms'] / sent, 2) if sent else None,
+            'idle_connections': len(self._idle),
+            'pool_size': self.size,
+        }
@@ -2,47 +2,50 @@ import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
-from sqlalchemy.orm import Session
-from auth.utils import ALGORITHM, SECRET_KEY, verify_password
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth.principal_cache import Principal, cache_principal, get_principal
+from auth.hashing import password_hasher
+from auth.utils import ALGORITHM, SECRET_KEY
 from models.auth_model import TokenData
 from database.schema import User
-from database.database import SessionLocal, engine, Base
-
-Base.metadata.create_all(bind=engine)
+from database.database import get_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def get_user(db: Session, username: str = None, email: str = None):
+async def get_user(db: AsyncSession, username: str = None, email: str = None):
     if username:
-        return db.query(User).filter(User.username == username).first()
+        return await db.scalar(select(User).filter(User.username == username))
     if email:
-        return db.query(User).filter(User.email == email).first()
+        return await db.scalar(select(User).filter(User.email == email))
     return None
 
 
-def authenticate_user(db: Session, password: str, username: str = None, email: str = None):
+async def authenticate_user(db: AsyncSession, password: str, username: str = None, email: str = None):
     user = None
     if username:
-        user = get_user(db, username=username)
+        user = await get_user(db, username=username)
     elif email:
-        user = get_user(db, email=email)
+        user = await get_user(db, email=email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        # Stored with an old cost; upgrade it now that we have the plaintext
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_current_user(db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    """Resolve the bearer token to a Principal.
+
+    The token is verified on every call; the user lookup behind it is served
+    from the principal cache when possible.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -58,15 +61,28 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except jwt.PyJWTError as e:
         logging.error(f"Token decoding error: {e}")
         raise credentials_exception
-    user = None
-    if check_if_username_is_email(token_data.username):
-        user = get_user(db, email=token_data.username)
-    else:
-        user = get_user(db, username=token_data.username)
-    if user is None:
-        logging.error(f"No user found with username: {token_data.username}")
+    principal = get_principal(token_data.username)
+    if principal is None:
+        user = None
+        if check_if_username_is_email(token_data.username):
+            user = await get_user(db, email=token_data.username)
+        else:
+            user = await get_user(db, username=token_data.username)
+        if user is None:
+            logging.error(f"No user found with username: {token_data.username}")
+            raise credentials_exception
+        principal = cache_principal(token_data.username, user)
+    if not principal.is_active:
+        logging.error(f"Inactive user: {token_data.username}")
         raise credentials_exception
-    return user
+    return principal
+
+
+async def get_current_admin(current_user: Principal = Depends(get_current_user)):
+    """Like get_current_user, but only for admins."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
 
 
 def check_if_username_is_email(username):
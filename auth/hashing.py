@@ -0,0 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from auth.utils import pwd_context
+from settings import settings
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool.
+
+    Hashing takes hundreds of milliseconds of CPU. Doing it on the shared
+    threadpool lets a burst of logins starve every other blocking call. Here
+    at most PASSWORD_HASH_WORKERS hashes run at once. No more than
+    PASSWORD_HASH_MAX_PENDING calls may be running or queued; beyond that
+    callers get a 503 straight away instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._stats = {'completed': 0, 'rejected': 0, 'rehashed': 0,
+                       'queue_seconds': 0.0, 'run_seconds': 0.0, 'max_seconds': 0.0}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._stats['rejected'] += 1
+            raise HTTPException(
+                status_code=503, detail="Too many sign-in attempts in progress, try again shortly",
+                headers={"Retry-After": "1"})
+
+        def timed():
+            started = time.perf_counter()
+            return started, fn(*args), time.perf_counter() - started
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            started, result, run_seconds = await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self._pending -= 1
+        self._stats['completed'] += 1
+        self._stats['queue_seconds'] += started - submitted
+        self._stats['run_seconds'] += run_seconds
+        self._stats['max_seconds'] = max(self._stats['max_seconds'], time.perf_counter() - submitted)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; also return a new hash if the stored one is outdated."""
+        verified, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            self._stats['rehashed'] += 1
+        return verified, new_hash
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        completed = self._stats['completed'] or 1
+        return {
+            'workers': self.workers,
+            'pending': self._pending,
+            'queue_depth': max(0, self._pending - self.workers),
+            'max_pending': self.max_pending,
+            'completed': self._stats['completed'],
+            'rejected': self._stats['rejected'],
+            'rehashed': self._stats['rehashed'],
+            'avg_queue_ms': round(self._stats['queue_seconds'] / completed * 1000, 1),
+            'avg_run_ms': round(self._stats['run_seconds'] / completed * 1000, 1),
+            'max_latency_ms': round(self._stats['max_seconds'] * 1000, 1),
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
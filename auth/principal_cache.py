@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from cache.ttl_lru import TTLCache
+from database.schema import User
+from settings import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only snapshot of the authenticated user.
+
+    This is what ``get_current_user`` returns. It is not bound to any
+    session, so one cached instance can safely serve concurrent requests.
+    """
+    id: int
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    is_admin: bool
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> 'Principal':
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            is_admin=bool(user.is_admin),
+            is_active=user.is_active is not False,
+        )
+
+
+# Token subject (username or email) -> Principal. Entries are dropped when
+# the ORM updates or deletes the user in this process. Other workers see the
+# change once AUTH_CACHE_TTL runs out.
+principal_cache = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL)
+
+
+def get_principal(subject: str) -> Optional[Principal]:
+    return principal_cache.get(subject)
+
+
+def cache_principal(subject: str, user: User) -> Principal:
+    principal = Principal.from_user(user)
+    principal_cache.set(subject, principal)
+    return principal
+
+
+def invalidate_principal(*subjects: str):
+    """Forget cached principals, e.g. after a bulk UPDATE that skips ORM events."""
+    for subject in subjects:
+        principal_cache.pop(subject)
+
+
+def _subjects(user: User):
+    """Every username/email the user had before and after this flush."""
+    state = inspect(user)
+    subjects = set()
+    for attr in ('username', 'email'):
+        history = state.attrs[attr].history
+        subjects.update(value for value in (*history.deleted, *history.unchanged, *history.added) if value)
+    return subjects
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, user: User):
+    subjects = _subjects(user)
+    invalidate_principal(*subjects)
+    # Drop them again once the change is visible to other sessions, in case
+    # a concurrent request re-cached the old row in the meantime.
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault('stale_principals', set()).update(subjects)
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_principals(session: Session):
+    invalidate_principal(*session.info.pop('stale_principals', ()))
@@ -0,0 +1,96 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from cache.ttl_lru import TTLCache
+
+
+class CacheBackend(ABC):
+    """Storage used by ResponseCache.
+
+    Entries are opaque bytes. Invalidation works through per-tag version
+    counters: cache keys embed the versions of their tags, so bumping a tag
+    makes every key built under the old version unreachable.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_versions(self, tags: List[str]) -> Dict[str, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bump(self, tags: List[str]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process store; the default when no shared cache is configured."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl)
+        self._versions = {}
+
+    async def get(self, key):
+        return self._entries.get(key)
+
+    async def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl)
+
+    async def get_versions(self, tags):
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    async def bump(self, tags):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """Store shared by every worker that points at the same Redis-compatible server."""
+
+    def __init__(self, url: str, prefix: str = 'response-cache:'):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_URL points at Redis but the 'redis' package is not installed") from e
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key):
+        return await self._redis.get(self._prefix + key)
+
+    async def set(self, key, value, ttl):
+        await self._redis.set(self._prefix + key, value, px=int(ttl * 1000))
+
+    async def get_versions(self, tags):
+        values = await self._redis.mget([f'{self._prefix}tag:{tag}' for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def bump(self, tags):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f'{self._prefix}tag:{tag}')
+            await pipe.execute()
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_backend(url: str, maxsize: int, ttl: float) -> CacheBackend:
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    if url.startswith('memory://'):
+        return MemoryBackend(maxsize, ttl)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
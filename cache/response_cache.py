@@ -0,0 +1,81 @@
+import logging
+from typing import Awaitable, Callable, List
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from cache.backends import create_backend
+from settings import settings
+
+
+class ResponseCache:
+    """Caches serialized JSON bodies of public read endpoints.
+
+    Entries are keyed on the route path and sorted query string and grouped
+    under tags (``"events"``, ``"event:12"``, ...). Write endpoints call
+    :meth:`invalidate` with the tags they touched once their transaction has
+    committed.
+    """
+
+    def __init__(self):
+        self.backend = create_backend(
+            settings.CACHE_URL, settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+        self.ttl = settings.CACHE_TTL_SECONDS
+        self._adapters = {}
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0, 'invalidations': 0}
+
+    def _adapter(self, response_type) -> TypeAdapter:
+        adapter = self._adapters.get(response_type)
+        if adapter is None:
+            adapter = self._adapters[response_type] = TypeAdapter(response_type)
+        return adapter
+
+    @staticmethod
+    def _key(request: Request, versions: dict) -> str:
+        query = '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.multi_items()))
+        tags = ','.join(f'{tag}@{version}' for tag, version in sorted(versions.items()))
+        return f'{request.url.path}?{query}#{tags}'
+
+    async def respond(self, request: Request, tags: List[str], response_type,
+                      render: Callable[[], Awaitable]) -> Response:
+        """Return the cached body for this request or render, store and return it."""
+        key = None
+        try:
+            key = self._key(request, await self.backend.get_versions(tags))
+            body = await self.backend.get(key)
+        except Exception as e:
+            logging.error(f"Response cache lookup failed: {e}")
+            self._stats['errors'] += 1
+            body = None
+
+        if body is not None:
+            self._stats['hits'] += 1
+            return Response(content=body, media_type='application/json', headers={'X-Cache': 'HIT'})
+
+        self._stats['misses'] += 1
+        adapter = self._adapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(await render(), from_attributes=True))
+        if key is not None:
+            try:
+                await self.backend.set(key, body, self.ttl)
+            except Exception as e:
+                logging.error(f"Response cache store failed: {e}")
+                self._stats['errors'] += 1
+        return Response(content=body, media_type='application/json', headers={'X-Cache': 'MISS'})
+
+    async def invalidate(self, *tags: str):
+        try:
+            await self.backend.bump(list(tags))
+            self._stats['invalidations'] += 1
+        except Exception as e:
+            logging.error(f"Response cache invalidation failed: {e}")
+            self._stats['errors'] += 1
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+response_cache = ResponseCache()
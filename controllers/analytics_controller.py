@@ -0,0 +1,75 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.dependancies import get_current_admin
+from auth.principal_cache import Principal
+from database.database import get_db
+from database.schema import PaymentRollup
+from models.analytics_model import RevenueBucket, RevenueReport
+
+router = APIRouter()
+
+# group_by value -> rollup column
+DIMENSIONS = {
+    "day": PaymentRollup.day,
+    "source": PaymentRollup.source,
+    "currency": PaymentRollup.currency,
+    "country": PaymentRollup.country,
+    "status": PaymentRollup.status,
+    "hosting_plan": PaymentRollup.hosting_plan_id,
+}
+
+
+@router.get("/revenue", response_model=RevenueReport)
+async def get_revenue(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_by: List[str] = Query(["currency", "status"], description=f"any of {', '.join(DIMENSIONS)}"),
+    source: Optional[str] = Query(None, description="payments or hosting_payments"),
+    currency: Optional[str] = None,
+    country: Optional[str] = None,
+    payment_status: Optional[str] = Query(None, alias="status"),
+    hosting_plan_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Payment counts and amount totals, grouped by the given dimensions.
+
+    Read from the payment_rollups table, not the payment tables. Days are
+    the payments' creation dates and amounts are in the currency subunit,
+    so group by currency when summing amounts.
+    """
+    group_by = [name for value in group_by for name in value.split(",") if name]
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by: {', '.join(unknown)}")
+    columns = [DIMENSIONS[name] for name in dict.fromkeys(group_by)]
+
+    count = func.sum(PaymentRollup.payment_count)
+    stmt = select(*columns, count.label("payment_count"), func.sum(PaymentRollup.amount).label("amount"))
+    if date_from:
+        stmt = stmt.filter(PaymentRollup.day >= date_from)
+    if date_to:
+        stmt = stmt.filter(PaymentRollup.day <= date_to)
+    if source:
+        stmt = stmt.filter(PaymentRollup.source == source)
+    if currency:
+        stmt = stmt.filter(PaymentRollup.currency == currency)
+    if country:
+        stmt = stmt.filter(PaymentRollup.country == country)
+    if payment_status:
+        stmt = stmt.filter(PaymentRollup.status == payment_status)
+    if hosting_plan_id is not None:
+        stmt = stmt.filter(PaymentRollup.hosting_plan_id == hosting_plan_id)
+    stmt = stmt.group_by(*columns).having(count != 0).order_by(*columns)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    return RevenueReport(
+        date_from=date_from,
+        date_to=date_to,
+        group_by=list(dict.fromkeys(group_by)),
+        buckets=[RevenueBucket(**row) for row in rows],
+    )
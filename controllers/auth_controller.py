@@ -2,27 +2,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from auth.dependancies import authenticate_user, check_if_username_is_email, get_current_user, get_user
-from auth.utils import create_access_token, get_password_hash
-from database.database import SessionLocal
+from auth.principal_cache import Principal
+from auth.hashing import password_hasher
+from auth.utils import create_access_token
+from database.database import get_db
 from database.schema import User
 from models.auth_model import UserBase as UserModel
 from models.auth_model import Token, UserCreate, UserResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/flogin", response_model=Token)
-def login_for_access_token_with_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token_with_form(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,13 +28,13 @@ def login_for_access_token_with_form(form_data: OAuth2PasswordRequestForm = Depe
 
 
 @router.post("/jlogin", response_model=Token)
-def login_for_access_token_with_json(user: UserModel, db: Session = Depends(get_db)):
+async def login_for_access_token_with_json(user: UserModel, db: AsyncSession = Depends(get_db)):
     res = None
     print(f"Passed user: {user.username}")
     if check_if_username_is_email(user.username):
-        res = authenticate_user(db, user.password, email=user.username)
+        res = await authenticate_user(db, user.password, email=user.username)
     else:
-        res = authenticate_user(db, user.password, username=user.username)
+        res = await authenticate_user(db, user.password, username=user.username)
     if not res:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,12 +46,12 @@ def login_for_access_token_with_json(user: UserModel, db: Session = Depends(get_
 
 
 @router.post("/signup", response_model=UserResponse, status_code=201)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user(db, username=user.username)
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await get_user(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=400, detail="Username already registered")
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     db_user = User(
         username=user.username,
         first_name=user.first_name,
@@ -66,11 +60,11 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     return current_user
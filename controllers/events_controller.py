@@ -1,29 +1,79 @@
-from pathlib import Path
+import aiofiles.os
 from fastapi.responses import FileResponse
 from json import JSONDecodeError, loads
 import os
-from typing import List
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from auth.dependancies import get_current_user
-from database.schema import Event, EventImages, Tag, User
-from database.database import SessionLocal
-from models.event_model import EventCreate, EventImageResponse, EventResponse, EventUpdateRequest, TagResponse
+from auth.principal_cache import Principal
+from cache.response_cache import response_cache
+from database.schema import Event, EventImages, Tag, event_tag_table
+from database.database import dialect_insert, get_db
+from database.pagination import PageParams, paginate
+from models.event_model import (EventCreate, EventImageResponse, EventResponse, EventSearchHit, EventUpdateRequest,
+                                TagResponse)
+from models.pagination import Page
+from services.event_search import refresh_search_vector, search_events
+from storage.content_store import content_store, image_path_cache
+from storage.derivatives import derivative_pipeline
+from storage.file_responses import file_response
+from storage.uploads import UploadBudget
 
-# Upload directory for event images
-UPLOAD_DIR = "uploads/events"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Loads an event with its tags, images and image variants in four queries,
+# however many events are selected.
+EVENT_LOAD_OPTIONS = (
+    selectinload(Event.tags),
+    selectinload(Event.eventImages).selectinload(EventImages.variants),
+)
 
 
-router = APIRouter()
+async def get_event_graph(db: AsyncSession, event_id: int):
+    return await db.scalar(
+        select(Event)
+        .options(*EVENT_LOAD_OPTIONS)
+        .filter(Event.id == event_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def resolve_tags(db: AsyncSession, tag_names: List[str]) -> List[Tag]:
+    """Return a Tag row for every name, creating missing ones.
+
+    Existing tags cost a single SELECT. Missing names are inserted in one
+    INSERT ... ON CONFLICT DO NOTHING against the unique tagName index, so
+    admins creating the same tag concurrently end up sharing one row.
+    """
+    names = list(dict.fromkeys(tag_names))
+    if not names:
+        return []
+    tags = {tag.tagName: tag for tag in await db.scalars(select(Tag).filter(Tag.tagName.in_(names)))}
+
+    missing = [name for name in names if name not in tags]
+    if missing:
+        await db.execute(
+            dialect_insert(db)(Tag).on_conflict_do_nothing(index_elements=[Tag.tagName]),
+            [{"tagName": name} for name in missing]
+        )
+        for tag in await db.scalars(select(Tag).filter(Tag.tagName.in_(missing))):
+            tags[tag.tagName] = tag
+    return [tags[name] for name in names]
+
+
+async def set_event_tags(db: AsyncSession, event_id: int, tags: List[Tag], replace: bool = False):
+    """Write an event's event_tag links in bulk."""
+    if replace:
+        await db.execute(delete(event_tag_table).where(event_tag_table.c.event_id == event_id))
+    if tags:
+        await db.execute(
+            insert(event_tag_table),
+            [{"event_id": event_id, "tag_id": tag.id} for tag in tags]
+        )
 
 
 # @router.post("/event", response_model=EventResponse)
@@ -57,8 +107,8 @@ router = APIRouter()
 async def create_event(
     event: str = File(...),  # JSON payload as a string
     images: List[UploadFile] = File(...),  # File uploads
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     # Parse the JSON string into the EventCreate Pydantic model
     try:
@@ -75,6 +125,9 @@ async def create_event(
     for image in images:
         if image.content_type not in ["image/jpeg", "image/png"]:
             raise HTTPException(status_code=400, detail="Invalid file type")
+    if len(event_obj.eventImages or []) < len(images):
+        raise HTTPException(status_code=400, detail="Missing image details")
+
     # Save event details
     event_date = "TBA" if event_obj.eventDate is None else event_obj.eventDate
     db_event = Event(
@@ -85,71 +138,94 @@ async def create_event(
         type=event_obj.type,
         eventDate=event_date,
         description=event_obj.description,
-        registrationLink=event_obj.registrationLink
+        registrationLink=event_obj.registrationLink,
+        eventImages=[]
     )
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.flush()
 
     # Create Tags
-    for tag in event_obj.tags:
-        db_tag = db.query(Tag).filter(Tag.tagName == tag.tagName).first()
-        if not db_tag:
-            db_tag = Tag(tagName=tag.tagName)
-            db.add(db_tag)
-        if db_tag not in db_event.tags:
-            db_event.tags.append(db_tag)
-
-    image_data = []
-    # Save Event Images
-    for image in images:
-        if image.content_type not in ["image/jpeg", "image/png"]:
-            raise HTTPException(status_code=400, detail="Invalid file type")
-
-        # Save file to the upload directory
-        file_path = os.path.join(UPLOAD_DIR, f"event_{db_event.id}_{image.filename}")
-        with open(file_path, "wb") as f:
-            content = await image.read()
-            f.write(content)
-
-        # Get the image description and image title from the request body
-        image_data = event_obj.eventImages[images.index(image)]
-
-        # Create EventImages record
-        db_image = EventImages(
-            imageUrl=file_path,
-            imageDescription=image_data.imageDescription,
-            imageTitle=image_data.imageTitle,
-            event=db_event
-        )
-        db.add(db_image)
-
-    db.commit()
-    db.refresh(db_event)
-
-    return db_event
+    db_tags = await resolve_tags(db, [tag.tagName for tag in event_obj.tags])
+    await set_event_tags(db, db_event.id, db_tags)
+    await refresh_search_vector(db, db_event.id)
 
+    # Save Event Images
+    budget = UploadBudget()
+    saved = []
+    db_images = []
+    try:
+        for image, image_data in zip(images, event_obj.eventImages):
+            # Stream the file into the content store
+            stored = await content_store.put(db, image, budget)
+            saved.append(stored)
+
+            # Create EventImages record
+            db_image = EventImages(
+                imageUrl=stored.path,
+                imageDescription=image_data.imageDescription,
+                imageTitle=image_data.imageTitle,
+                event=db_event
+            )
+            db.add(db_image)
+            db_images.append(db_image)
+
+        await db.commit()
+    except BaseException:
+        await content_store.discard(db, saved)
+        raise
+    derivative_pipeline.schedule(db_event.id, db_images)
+    await response_cache.invalidate("events", "tags")
+    return await get_event_graph(db, db_event.id)
+
+
+@router.get("/events", response_model=Page[EventResponse])
+async def get_all_events(
+    request: Request,
+    event_type: Optional[str] = Query(None, alias="type"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    """ Get events, newest first """
+    async def render():
+        stmt = select(Event).options(*EVENT_LOAD_OPTIONS)
+        if event_type:
+            stmt = stmt.filter(Event.type == event_type)
+        return await paginate(db, stmt, Event, page)
+
+    return await response_cache.respond(request, ["events"], Page[EventResponse], render)
+
+
+@router.get("/events/search", response_model=Page[EventSearchHit])
+async def search_all_events(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db)
+):
+    """ Search events by title, tags, venue, paragraph and description, best match first """
+    async def render():
+        return await search_events(db, q, limit, cursor, EVENT_LOAD_OPTIONS)
 
-@router.get("/events", response_model=List[EventResponse])
-def get_all_events(db: Session = Depends(get_db)):
-    """ Get all events"""
-    events = db.query(Event).all()
-    return events
+    return await response_cache.respond(request, ["events"], Page[EventSearchHit], render)
 
 
 @router.get("/event/{event_id}", response_model=EventResponse)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+async def get_event(event_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """ Get single event """
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return event
+    async def render():
+        event = await get_event_graph(db, event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        return event
+
+    return await response_cache.respond(request, [f"event:{event_id}"], EventResponse, render)
 
 
 @router.put("/event/{event_id}", response_model=EventResponse)
-def update_event(event_id: int, event: EventCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_event(event_id: int, event: EventCreate, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     """ Update event """
-    db_event = db.query(Event).filter(Event.id == event_id).first()
+    db_event = await get_event_graph(db, event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
 
@@ -164,76 +240,97 @@ def update_event(event_id: int, event: EventCreate, db: Session = Depends(get_db
     db_event.registrationLink = event.registrationLink
 
     # Update Tags
-    db_event.tags = []
-    for tag in event.tags:
-        db_tag = db.query(Tag).filter(Tag.tagName == tag.tagName).first()
-        if not db_tag:
-            db_tag = Tag(tagName=tag.tagName)
-            db.add(db_tag)
-        db_event.tags.append(db_tag)
-
-    # Update Event images
-    db.query(EventImages).filter(EventImages.event_id == event_id).delete()
+    db_tags = await resolve_tags(db, [tag.tagName for tag in event.tags])
+    await set_event_tags(db, event_id, db_tags, replace=True)
+    await refresh_search_vector(db, event_id)
+
+    # Update Event images; the old files go once the new set is committed
+    old_images = list(db_event.eventImages)
+    for image in old_images:
+        await db.delete(image)
     for image in event.eventImages:
         db_image = EventImages(
             imageUrl=image.imageUrl,
             imageDescription=image.imageDescription,
+            imageTitle=image.imageTitle,
             event=db_event
         )
         db.add(db_image)
 
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    await db.commit()
+    for image in old_images:
+        image_path_cache.pop(image.id)
+    await content_store.release(db, [image.imageUrl for image in old_images])
+    await response_cache.invalidate("events", f"event:{event_id}", "tags")
+    return await get_event_graph(db, event_id)
 
 
 @router.delete("/event/{event_id}")
-def delete_event(event_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_event(event_id: int, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     """ Delete event """
-    db_event = db.query(Event).filter(Event.id == event_id).first()
+    db_event = await get_event_graph(db, event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
-    db.delete(db_event)
-    db.commit()
+
+    # Images are not cascaded from the event; delete them with it and
+    # release their files once the rows are gone
+    images = list(db_event.eventImages)
+    for image in images:
+        await db.delete(image)
+    await db.delete(db_event)
+    await db.commit()
+    for image in images:
+        image_path_cache.pop(image.id)
+    await content_store.release(db, [image.imageUrl for image in images])
+    await response_cache.invalidate("events", f"event:{event_id}")
     return {"message": "Event deleted successfully"}
 
 
-@router.get("/tags", response_model=List[TagResponse])
-def get_all_tags(db: Session = Depends(get_db)):
-    """ Get all tags """
-    tags = db.query(Tag).all()
-    return tags
+@router.get("/tags", response_model=Page[TagResponse])
+async def get_all_tags(request: Request, page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    """ Get tags, newest first """
+    async def render():
+        return await paginate(db, select(Tag), Tag, page)
 
+    return await response_cache.respond(request, ["tags"], Page[TagResponse], render)
 
-@router.get("/event-images", response_model=List[EventImageResponse])
-def get_all_events(db: Session = Depends(get_db)):
-    """ Get all images """
-    event_images = db.query(EventImages).all()
-    return event_images
+
+@router.get("/event-images", response_model=Page[EventImageResponse])
+async def get_all_event_images(
+    event_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    """ Get images, newest first """
+    stmt = select(EventImages).options(selectinload(EventImages.variants))
+    if event_id is not None:
+        stmt = stmt.filter(EventImages.event_id == event_id)
+    return await paginate(db, stmt, EventImages, page)
 
 
 @router.patch("/events/{event_id}")
-def update_event_partial(event_id: int, update_data: EventUpdateRequest, db: Session = Depends(get_db)):
+async def update_event_partial(event_id: int, update_data: EventUpdateRequest, db: AsyncSession = Depends(get_db)):
     # Find the event by ID
-    event = db.query(Event).filter(Event.id == event_id).first()
+    event = await db.scalar(select(Event).filter(Event.id == event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
     # Update only the fields provided in the request
     for key, value in update_data.model_dump(exclude_unset=True).items():
         setattr(event, key, value)
+    await refresh_search_vector(db, event_id)
 
     # Save changes
-    db.commit()
-    db.refresh(event)
-    return event
+    await db.commit()
+    await response_cache.invalidate("events", f"event:{event_id}")
+    return await get_event_graph(db, event_id)
 
 
 @router.get("/event/{event_id}/images", response_model=List[EventImageResponse])
-def get_event_images(event_id: int, db: Session = Depends(get_db)):
+async def get_event_images(event_id: int, db: AsyncSession = Depends(get_db)):
     """Get all images for a specific event."""
-    images = db.query(EventImages).filter(
-        EventImages.event_id == event_id).all()
+    images = (await db.scalars(select(EventImages).options(selectinload(EventImages.variants)).filter(
+        EventImages.event_id == event_id))).all()
     if not images:
         raise HTTPException(
             status_code=404, detail="No images found for this event")
@@ -241,21 +338,19 @@ def get_event_images(event_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/event/{event_id}/images/{image_id}")
-def delete_event_image(event_id: int, image_id: int, db: Session = Depends(get_db)):
+async def delete_event_image(event_id: int, image_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a specific image from an event."""
-    image = db.query(EventImages).filter(EventImages.id ==
-                                         image_id, EventImages.event_id == event_id).first()
+    image = await db.scalar(select(EventImages).options(selectinload(EventImages.variants)).filter(
+        EventImages.id == image_id, EventImages.event_id == event_id))
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
-    # Delete file from the filesystem
-    image_path = Path(image.imageUrl)
-    if image_path.exists():
-        image_path.unlink()
-
-    # Delete the database record
-    db.delete(image)
-    db.commit()
+    # Delete the database record, then the file if nothing else uses it
+    await db.delete(image)
+    await db.commit()
+    image_path_cache.pop(image.id)
+    await content_store.release(db, [image.imageUrl])
+    await response_cache.invalidate("events", f"event:{event_id}")
     return {"message": "Image deleted successfully"}
 
 
@@ -263,55 +358,74 @@ def delete_event_image(event_id: int, image_id: int, db: Session = Depends(get_d
 async def update_event_images(
     event_id: int,
     new_images: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Replace all images for a specific event."""
-    db_event = db.query(Event).filter(Event.id == event_id).first()
+    db_event = await get_event_graph(db, event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    # Delete existing images
-    existing_images = db.query(EventImages).filter(
-        EventImages.event_id == event_id).all()
-    for image in existing_images:
-        image_path = Path(image.imageUrl)
-        if image_path.exists():
-            image_path.unlink()
-        db.delete(image)
-
-    # Add new images
     for image in new_images:
         if image.content_type not in ["image/jpeg", "image/png", "image/webp"]:
             raise HTTPException(status_code=400, detail="Invalid file type")
 
-        # Save file to the upload directory
-        file_path = os.path.join(UPLOAD_DIR, f"event_{event_id}_{image.filename}")
-        with open(file_path, "wb") as f:
-            content = await image.read()
-            f.write(content)
-
-        # Create new EventImages record
-        db_image = EventImages(
-            imageUrl=file_path,
-            imageDescription="Updated event image",
-            imageTitle=image.filename,
-            event=db_event
-        )
-        db.add(db_image)
+    # Delete existing images; their files go once the new set is committed
+    old_images = list(db_event.eventImages)
+    for image in old_images:
+        await db.delete(image)
 
-    db.commit()
+    # Add new images
+    budget = UploadBudget()
+    saved = []
+    db_images = []
+    try:
+        for image in new_images:
+            # Stream the file into the content store
+            stored = await content_store.put(db, image, budget)
+            saved.append(stored)
+
+            # Create new EventImages record
+            db_image = EventImages(
+                imageUrl=stored.path,
+                imageDescription="Updated event image",
+                imageTitle=image.filename,
+                event=db_event
+            )
+            db.add(db_image)
+            db_images.append(db_image)
+
+        await db.commit()
+    except BaseException:
+        await content_store.discard(db, saved)
+        raise
+
+    for image in old_images:
+        image_path_cache.pop(image.id)
+    await content_store.release(db, [image.imageUrl for image in old_images])
+    derivative_pipeline.schedule(event_id, db_images)
+    await response_cache.invalidate("events", f"event:{event_id}")
     return {"message": "Event images updated successfully"}
 
 
 @router.get("/event-images/{image_id}/file", response_class=FileResponse)
-def download_event_image(image_id: int, db: Session = Depends(get_db)):
-    """Download a specific image file by image ID."""
-    image = db.query(EventImages).filter(EventImages.id == image_id).first()
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
+async def download_event_image(image_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Download a specific image file by image ID.
+
+    Supports If-None-Match/If-Modified-Since and byte ranges, so interrupted
+    downloads can resume.
+    """
+    file_path = image_path_cache.get(image_id)
+    if file_path is None:
+        file_path = await db.scalar(select(EventImages.imageUrl).filter(EventImages.id == image_id))
+        if not file_path:
+            raise HTTPException(status_code=404, detail="Image not found")
+        image_path_cache.set(image_id, file_path)
 
-    file_path = Path(image.imageUrl)
-    if not file_path.exists():
+    try:
+        stat_result = await aiofiles.os.stat(file_path)
+    except FileNotFoundError:
+        image_path_cache.pop(image_id)
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path, media_type="application/octet-stream", filename=file_path.name)
+    return file_response(request.headers, file_path, stat_result,
+                         media_type="application/octet-stream", filename=os.path.basename(file_path))
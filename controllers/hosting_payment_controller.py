@@ -1,35 +1,57 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import logging
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from api.paystack_api import paystack_api
-from database.database import SessionLocal
-from sqlalchemy.orm import Session, joinedload
+from api.resilience import CircuitOpenError
+from database.database import get_db
+from database.pagination import PageParams, paginate
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from database.schema import HostingPayment, HostingPlans
 from models.hosting_payment_model import HostingPaymentModel, HostingPaymentResponse
+from models.pagination import Page
+from auth.dependancies import get_current_admin
+from auth.principal_cache import Principal
+from services import revenue
+from services.exports import export_response
+from services.idempotency import idempotency_store
+from services.payment_status import apply_status
 from settings import settings
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/initialize")
+async def initialize_payment(payment: HostingPaymentModel, request: Request,
+                             idempotency_key: Optional[str] = Header(None),
+                             db: AsyncSession = Depends(get_db)):
+    """Start a Paystack transaction for a hosting plan.
 
+    Send an ``Idempotency-Key`` header to make retries safe: a repeat with
+    the same key gets the first response back instead of a new transaction.
+    """
+    return await idempotency_store.run("hosting_payments.initialize", idempotency_key, await request.body(),
+                                       lambda: _initialize_payment(payment, db), owner=payment.email)
 
-@router.post("/initialize")
-async def initialize_payment(payment: HostingPaymentModel, db: Session = Depends(get_db)):
+
+async def _initialize_payment(payment: HostingPaymentModel, db: AsyncSession):
     try:
         email = payment.email
         full_name = payment.full_name
         phone = payment.phone
 
-        hosting_plan = db.query(HostingPlans).filter(
-            HostingPlans.id == payment.hosting_plan_id).first()
+        # Priced from the row itself, not the catalog snapshot, which may
+        # lag a plan created or repriced on another worker.
+        hosting_plan = await db.get(HostingPlans, payment.hosting_plan_id)
+        amount = hosting_plan.annual_price if hosting_plan else None
+        # Give the connection back to the pool rather than hold it open
+        # across the Paystack call.
+        await db.commit()
 
         if not hosting_plan:
             raise HTTPException(
@@ -39,11 +61,8 @@ async def initialize_payment(payment: HostingPaymentModel, db: Session = Depends
             raise HTTPException(
                 status_code=400, detail="Email and Name are required.")
 
-        amount = hosting_plan.annual_price
-        print(settings.CALLBACK_URL)
-
         payment_details = {
-            "currency": "KES",
+            "currency": revenue.HOSTING_CURRENCY,
             "amount": amount * 100,
             "email": email,
             "callback_url": settings.CALLBACK_URL,
@@ -65,25 +84,32 @@ async def initialize_payment(payment: HostingPaymentModel, db: Session = Depends
             full_name=full_name,
             paymentReference=reference,
             phone=phone,
-            hosting_plan_id=hosting_plan.id,
+            hosting_plan_id=payment.hosting_plan_id,
+            amount=payment_details["amount"],
             status="pending"
         )
 
         db.add(payment_record)
-        db.commit()
-        db.refresh(payment_record)
+        await revenue.record_created(db, payment_record)
+        await db.commit()
+        await db.refresh(payment_record)
         return {
             "message": "Payment initialized successfully",
             "data": data
         }
+    except HTTPException:
+        raise
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503, detail="Payment provider unavailable, please retry shortly")
     except Exception as e:
-        print(f"Error initializing payment: {e}")
+        logging.error(f"Error initializing payment: {e}")
         raise HTTPException(
             status_code=500, detail=f"Error initializing payment: {e}")
 
 
 @router.get("/verify/{reference}")
-async def verify_payment(reference: str, db: Session = Depends(get_db)):
+async def verify_payment(reference: str, db: AsyncSession = Depends(get_db)):
     if not reference:
         raise HTTPException(
             status_code=400, detail="Missing transaction reference")
@@ -103,8 +129,8 @@ async def verify_payment(reference: str, db: Session = Depends(get_db)):
                                 detail=f"Transaction: {transaction_status}")
 
         # Check for existing payment record
-        existing_payment = db.query(HostingPayment).filter(
-            HostingPayment.paymentReference == payment_reference).first()
+        existing_payment = await db.scalar(select(HostingPayment).filter(
+            HostingPayment.paymentReference == payment_reference))
 
         if existing_payment:
             # raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Payment reference already exists")
@@ -113,13 +139,16 @@ async def verify_payment(reference: str, db: Session = Depends(get_db)):
                 "data": existing_payment
             }
 
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503, detail="Payment provider unavailable, please retry shortly")
     except Exception as e:
-        print(f"Error verifying payment: {e}")
+        logging.error(f"Error verifying payment: {e}")
         raise HTTPException(status_code=500, detail="Failed to verify payment")
 
 
 @router.get("/callback/{reference}")
-async def payment_callback(reference: str, db: Session = Depends(get_db)):
+async def payment_callback(reference: str, db: AsyncSession = Depends(get_db)):
     if not reference:
         raise HTTPException(
             status_code=400, detail="Missing transaction reference")
@@ -130,17 +159,15 @@ async def payment_callback(reference: str, db: Session = Depends(get_db)):
         payment_status = paystack_response['data']['status']
 
         if payment_status in ['success', 'abandoned']:
-            payment_record = db.query(HostingPayment).filter(
+            await apply_status(db, HostingPayment, reference, payment_status)
+            await db.commit()
+            payment_record = await db.scalar(select(HostingPayment).filter(
                 HostingPayment.paymentReference == reference
-            ).first()
+            ))
 
             if not payment_record:
                 return JSONResponse(status_code=404, content={"message": "Payment not found"})
 
-            payment_record.status = payment_status
-            db.commit()
-            db.refresh(payment_record)
-
             # Use jsonable_encoder to serialize the object
             serialized_payment = jsonable_encoder(payment_record)
             message = "Payment processed successfully" if payment_status == 'success' else "Payment abandoned"
@@ -148,14 +175,50 @@ async def payment_callback(reference: str, db: Session = Depends(get_db)):
 
         return JSONResponse(status_code=400, content={"message": "Payment failed or not successful"})
 
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503, detail="Payment provider unavailable, please retry shortly")
     except Exception as e:
-        print(f"Error handling payment callback: {e}")
+        logging.error(f"Error handling payment callback: {e}")
         raise HTTPException(
             status_code=500, detail=f"Failed to process payment callback: {e}")
 
 
-@router.get("/payments", response_model=List[HostingPaymentResponse])
-async def get_payments(db: Session = Depends(get_db)):
-    payments = db.query(HostingPayment).options(
-        joinedload(HostingPayment.hosting_plan)).all()
-    return payments
+@router.get("/payments", response_model=Page[HostingPaymentResponse])
+async def get_payments(
+    payment_status: Optional[str] = Query(None, alias="status"),
+    email: Optional[str] = None,
+    hosting_plan_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    stmt = select(HostingPayment).options(joinedload(HostingPayment.hosting_plan))
+    if payment_status:
+        stmt = stmt.filter(HostingPayment.status == payment_status)
+    if email:
+        stmt = stmt.filter(HostingPayment.email == email)
+    if hosting_plan_id is not None:
+        stmt = stmt.filter(HostingPayment.hosting_plan_id == hosting_plan_id)
+    return await paginate(db, stmt, HostingPayment, page)
+
+
+@router.get("/payments/export")
+async def export_payments(
+    export_format: str = Query("csv", alias="format", description="csv or ndjson"),
+    payment_status: Optional[str] = Query(None, alias="status"),
+    hosting_plan_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Download every matching hosting payment as CSV or NDJSON, streamed in id order"""
+    stmt = select(*HostingPayment.__table__.columns).order_by(HostingPayment.id)
+    if payment_status:
+        stmt = stmt.filter(HostingPayment.status == payment_status)
+    if hosting_plan_id is not None:
+        stmt = stmt.filter(HostingPayment.hosting_plan_id == hosting_plan_id)
+    if created_from:
+        stmt = stmt.filter(HostingPayment.created_at >= created_from)
+    if created_to:
+        stmt = stmt.filter(HostingPayment.created_at < created_to)
+    return export_response(stmt, export_format, "hosting-payments")
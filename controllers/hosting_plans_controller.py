@@ -1,7 +1,10 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from database.database import SessionLocal
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Request
+from cache.response_cache import response_cache
+from services.hosting_plan_catalog import CATALOG_TAG, hosting_plan_catalog
+from database.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.schema import HostingPlanFeatures, HostingPlans
 from models.hosting_model import HostingPlansCreate, HostingPlansResponse
@@ -9,46 +12,36 @@ from models.hosting_model import HostingPlansCreate, HostingPlansResponse
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.get("/hosting_plans", response_model=List[HostingPlansResponse])
-def get_all_hosting_plans(db: Session = Depends(get_db)):
+async def get_all_hosting_plans(request: Request, db: AsyncSession = Depends(get_db)):
     """Get all hostng plans"""
-    hosting_plans = db.query(HostingPlans).all()
-    for plan in hosting_plans:
-        plan.features = db.query(HostingPlanFeatures).filter(
-            HostingPlanFeatures.hosting_plan_id == plan.id).all()
-    return hosting_plans
+    async def render():
+        return await hosting_plan_catalog.get_all(db)
+
+    return await response_cache.respond(request, [CATALOG_TAG], List[HostingPlansResponse], render)
 
 
 @router.get("/hosting_plan/{hosting_plan_id}", response_model=HostingPlansResponse)
-def get_hosting_plan(hosting_plan_id: int, db: Session = Depends(get_db)):
+async def get_hosting_plan(hosting_plan_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """Get a single hosting plan"""
-    hosting_plan = db.query(HostingPlans).filter(
-        HostingPlans.id == hosting_plan_id).first()
+    async def render():
+        hosting_plan = await hosting_plan_catalog.get(db, hosting_plan_id)
 
-    if not hosting_plan:
-        raise HTTPException(status_code=404, detail="Hosting plan not found")
+        if not hosting_plan:
+            raise HTTPException(status_code=404, detail="Hosting plan not found")
+        return hosting_plan
 
-    hosting_plan.features = db.query(HostingPlanFeatures).filter(
-        HostingPlanFeatures.hosting_plan_id == hosting_plan.id).all()
-    return hosting_plan
+    return await response_cache.respond(request, [CATALOG_TAG], HostingPlansResponse, render)
 
 
 @router.post("/hosting_plan")
-def create_hosting_plan(hosting_plan: HostingPlansCreate, db: Session = Depends(get_db)):
+async def create_hosting_plan(hosting_plan: HostingPlansCreate, db: AsyncSession = Depends(get_db)):
     """Create Hosting Plan"""
     if not hosting_plan:
         raise HTTPException(status_code=400, detail="Hosting Plan invalid")
 
-    existing_hosting_plan = db.query(HostingPlans).filter(
-        HostingPlans.title == hosting_plan.title).first()
+    existing_hosting_plan = await db.scalar(select(HostingPlans).filter(
+        HostingPlans.title == hosting_plan.title))
 
     if existing_hosting_plan:
         raise HTTPException(status_code=400, detail="Plan already exists")
@@ -60,8 +53,8 @@ def create_hosting_plan(hosting_plan: HostingPlansCreate, db: Session = Depends(
         subtitle=hosting_plan.subtitle,
     )
     db.add(db_hosting_plan)
-    db.commit()
-    db.refresh(db_hosting_plan)
+    await db.commit()
+    await db.refresh(db_hosting_plan)
 
     for feature in hosting_plan.features:
         db_feature = HostingPlanFeatures(
@@ -70,17 +63,18 @@ def create_hosting_plan(hosting_plan: HostingPlansCreate, db: Session = Depends(
         )
         db.add(db_feature)
 
-    db.commit()
-    db.refresh(db_hosting_plan)
+    await db.commit()
+    await db.refresh(db_hosting_plan)
+    await hosting_plan_catalog.invalidate()
 
     return db_hosting_plan
 
 
 @router.delete("/hosting_plan/{hosting_plan_id}", status_code=204)
-def delete_hosting_plan(hosting_plan_id: int, db: Session = Depends(get_db)):
+async def delete_hosting_plan(hosting_plan_id: int, db: AsyncSession = Depends(get_db)):
     """Delete hosting plan"""
-    hosting_plan = db.query(HostingPlans).filter(
-        HostingPlans.id == hosting_plan_id).first()
+    hosting_plan = await db.scalar(select(HostingPlans).filter(
+        HostingPlans.id == hosting_plan_id))
 
     if not hosting_plan:
         return HTTPException(status_code=404, detail="Hosting plan not found")
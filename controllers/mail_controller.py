@@ -1,35 +1,24 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from api.mail_api import mail_api
 from models.contact_form import ContactForm
-from database.database import SessionLocal
-from sqlalchemy.orm import Session
+from database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from database.schema import ContactForm as Form
 from pydantic import ValidationError
+from services.outbox import enqueue_email, outbox_worker
 
 import logging
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/contact")
-async def send_email(contact_form: ContactForm):
+async def send_email(contact_form: ContactForm, db: AsyncSession = Depends(get_db)):
     try:
-        # Create message
-        message = "Subject: New Contact Us Message\n\n"
-        message += f"Name: {contact_form.name}\n"
-        message += f"Email: {contact_form.email}\n"
-        message += f"Message:\n{contact_form.message}"
-
-        # Connect to the server and send the email
-        await mail_api.send_email(contact_form)
+        # Queue the email; the outbox worker delivers it
+        enqueue_email(db, 'contact', mail_api.build_contact_message(contact_form))
+        await db.commit()
+        outbox_worker.notify()
 
         return {"message": "Email sent successfully"}
     except Exception as e:
@@ -38,31 +27,23 @@ async def send_email(contact_form: ContactForm):
 
 
 @router.post("/webgenerator-email")
-async def webgenerator_email(request: Request, db: Session = Depends(get_db)):
+async def webgenerator_email(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         # Parse request JSON into a Pydantic model
         form_data = await request.json()
         logging.info(f"Received contact form: {form_data}")
         contact_form = ContactForm(**form_data)
 
-        # Create message
-        message = "Subject: New Contact Us Message\n\n"
-        message += f"Name: {contact_form.name}\n"
-        message += f"Email: {contact_form.email}\n"
-        message += f"Message:\n{contact_form.message}"
-
-        # Send the email
-        await mail_api.send_email(contact_form)
-
-        # Save the contact form to the database
+        # Save the contact form and queue the email in one transaction
         form = Form(
             name=contact_form.name,
             email=contact_form.email,
             message=contact_form.message
         )
         db.add(form)
-        db.commit()
-        db.refresh(form)
+        enqueue_email(db, 'contact', mail_api.build_contact_message(contact_form))
+        await db.commit()
+        outbox_worker.notify()
 
         return {"message": "Email sent successfully"}
     except ValidationError as ve:
@@ -76,17 +57,19 @@ async def webgenerator_email(request: Request, db: Session = Depends(get_db)):
 
 # TODO: Method implementation incomplete
 @router.post("/hosting-payment-confirmed")
-async def hosting_payment_confirmed(request: Request):
+async def hosting_payment_confirmed(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         # Parse request JSON into a Pydantic model
         form_data = await request.json()
         logging.info(f"Received payment confirmation: {form_data}")
 
-        # Send a confirmation email
-        await mail_api.send_payment_confirmation(form_data)
+        # Queue a confirmation email
+        enqueue_email(db, 'noreply', mail_api.build_payment_confirmation(form_data))
+        await db.commit()
+        outbox_worker.notify()
 
         return {"message": "Payment confirmation email sent successfully"}
-    except ValidationError as ve:
+    except (ValidationError, KeyError) as ve:
         logging.error(f"Validation error: {ve}")
         raise HTTPException(status_code=422, detail="Invalid form data")
     except Exception as e:
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+from api.mail_api import mail_api
+from api.paystack_api import paystack_api
+from auth.dependancies import get_current_admin
+from auth.hashing import password_hasher
+from auth.principal_cache import Principal, principal_cache
+from cache.response_cache import response_cache
+from services.idempotency import idempotency_store
+from services.outbox import outbox_worker
+from services.paystack_webhooks import webhook_processor
+from services.reconciliation import reconciler
+from storage.content_store import image_path_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics(current_user: Principal = Depends(get_current_admin)):
+    """Runtime counters for this worker (admins only)"""
+    return {
+        "mail": mail_api.stats(),
+        "paystack": paystack_api.stats(),
+        "outbox": outbox_worker.stats(),
+        "paystack_webhooks": webhook_processor.stats(),
+        "reconciliation": reconciler.stats(),
+        "response_cache": response_cache.stats(),
+        "image_path_cache": image_path_cache.stats(),
+        "auth_principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "idempotency": idempotency_store.stats(),
+    }
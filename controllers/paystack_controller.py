@@ -1,8 +1,24 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, status
-from sqlalchemy.orm import Session
-from database.database import SessionLocal
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Depends, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import get_db
+from database.pagination import PageParams, paginate
 from database.schema import Payment
 from api.paystack_api import paystack_api
+from api.resilience import CircuitOpenError
+from models.pagination import Page
+from models.payment_model import PaymentResponse
+from auth.dependancies import get_current_admin
+from auth.principal_cache import Principal
+from services import revenue
+from services.exports import export_response
+from services.idempotency import idempotency_store
+from services.payment_status import apply_status
+from services.paystack_webhooks import store_event, verify_signature, webhook_processor
 
 router = APIRouter()
 
@@ -10,19 +26,30 @@ router = APIRouter()
 USD_PAYMENT_AMOUNT = 3900  # 39 USD
 KSH_PAYMENT_AMOUNT = 500000  # 5000 KSH
 
-# Dependency for database session
+
+@router.post("/initialize")
+async def initialize_payment(request: Request, idempotency_key: Optional[str] = Header(None),
+                             db: AsyncSession = Depends(get_db)):
+    """Start a Paystack transaction.
+
+    Send an ``Idempotency-Key`` header to make retries safe: a repeat with
+    the same key gets the first response back instead of a new transaction.
+    """
+    body = await request.body()
+    return await idempotency_store.run("payments.initialize", idempotency_key, body,
+                                       lambda: _initialize_payment(request, db), owner=_payer_email(body))
 
 
-def get_db():
-    db = SessionLocal()
+def _payer_email(body: bytes) -> str:
+    """The email an initialize request pays for; it scopes the Idempotency-Key."""
     try:
-        yield db
-    finally:
-        db.close()
+        email = json.loads(body).get('email')
+    except (ValueError, AttributeError):
+        return ''
+    return email if isinstance(email, str) else ''
 
 
-@router.post("/initialize")
-async def initialize_payment(request: Request, db: Session = Depends(get_db)):
+async def _initialize_payment(request: Request, db: AsyncSession):
     try:
         body = await request.json()
         amount = USD_PAYMENT_AMOUNT
@@ -35,12 +62,8 @@ async def initialize_payment(request: Request, db: Session = Depends(get_db)):
             raise HTTPException(
                 status_code=400, detail="Email and Name are required.")
 
-        if country == "Kenya":
-            amount = KSH_PAYMENT_AMOUNT
-            CURRENCY = "KES"
-        else:
-            amount = USD_PAYMENT_AMOUNT
-            CURRENCY = "USD"
+        CURRENCY = revenue.payment_currency(country)
+        amount = KSH_PAYMENT_AMOUNT if CURRENCY == "KES" else USD_PAYMENT_AMOUNT
 
         payment_details = {
             "amount": amount,
@@ -71,21 +94,25 @@ async def initialize_payment(request: Request, db: Session = Depends(get_db)):
         )
 
         db.add(payment_record)
-        db.commit()
-        db.refresh(payment_record)
+        await revenue.record_created(db, payment_record)
+        await db.commit()
+        await db.refresh(payment_record)
         return {
             "message": "Payment initialized successfully",
             "data": data
         }
 
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503, detail="Payment provider unavailable, please retry shortly")
     except Exception as e:
-        print(f"Error initializing payment: {e}")
+        logging.error(f"Error initializing payment: {e}")
         raise HTTPException(
             status_code=500, detail=f"Error initializing payment: {e}")
 
 
 @router.get("/verify")
-async def verify_payment(reference: str, db: Session = Depends(get_db)):
+async def verify_payment(reference: str, db: AsyncSession = Depends(get_db)):
     if not reference:
         raise HTTPException(
             status_code=400, detail="Missing transaction reference")
@@ -105,8 +132,8 @@ async def verify_payment(reference: str, db: Session = Depends(get_db)):
                                 detail=f"Transaction: {transaction_status}")
 
         # Check for existing payment record
-        existing_payment = db.query(Payment).filter(
-            Payment.paymentReference == payment_reference).first()
+        existing_payment = await db.scalar(select(Payment).filter(
+            Payment.paymentReference == payment_reference))
 
         if existing_payment:
             # raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Payment reference already exists")
@@ -133,13 +160,16 @@ async def verify_payment(reference: str, db: Session = Depends(get_db)):
         #     "data": payment_record
         # }
 
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503, detail="Payment provider unavailable, please retry shortly")
     except Exception as e:
-        print(f"Error verifying payment: {e}")
+        logging.error(f"Error verifying payment: {e}")
         raise HTTPException(status_code=500, detail="Failed to verify payment")
 
 
 @router.get("/callback")
-async def payment_callback(reference: str, db: Session = Depends(get_db)):
+async def payment_callback(reference: str, db: AsyncSession = Depends(get_db)):
     if not reference:
         raise HTTPException(
             status_code=400, detail="Missing transaction reference")
@@ -158,27 +188,80 @@ async def payment_callback(reference: str, db: Session = Depends(get_db)):
 
         if paystack_response['data']['status'] == 'success':
             # Confirm the payment, update the database
-            payment_record = db.query(Payment).filter(
+            await apply_status(db, Payment, reference, 'success')
+            await db.commit()
+            payment_record = await db.scalar(select(Payment).filter(
                 Payment.paymentReference == reference
-            ).first()
+            ))
 
             if payment_record:
-                payment_record.status = "completed"
-                db.commit()
                 return {"message": "Payment processed successfully", "data": payment_record}
             else:
                 return {"message": "Payment not found"}
 
         return {"message": "Payment failed or not successful"}
 
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503, detail="Payment provider unavailable, please retry shortly")
     except Exception as e:
-        print(f"Error handling payment callback: {e}")
+        logging.error(f"Error handling payment callback: {e}")
         raise HTTPException(
             status_code=500, detail=f"Failed to process payment callback: {e}"
         )
 
 
-@router.get("/payments")
-async def get_payments(db: Session = Depends(get_db)):
-    payments = db.query(Payment).all()
-    return payments
+@router.post("/webhook")
+async def paystack_webhook(request: Request, db: AsyncSession = Depends(get_db)):
+    """Receive a Paystack event.
+
+    The signature is checked over the raw body, the event is stored and
+    acknowledged, and the webhook worker applies it in the background.
+    """
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("x-paystack-signature")):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    try:
+        payload = json.loads(body)
+        payload["event"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid event payload")
+
+    await store_event(db, payload, body)
+    await db.commit()
+    webhook_processor.notify()
+    return {"message": "Event received"}
+
+
+@router.get("/payments", response_model=Page[PaymentResponse])
+async def get_payments(
+    payment_status: Optional[str] = Query(None, alias="status"),
+    email: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    stmt = select(Payment)
+    if payment_status:
+        stmt = stmt.filter(Payment.status == payment_status)
+    if email:
+        stmt = stmt.filter(Payment.email == email)
+    return await paginate(db, stmt, Payment, page)
+
+
+@router.get("/payments/export")
+async def export_payments(
+    export_format: str = Query("csv", alias="format", description="csv or ndjson"),
+    payment_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Download every matching payment as CSV or NDJSON, streamed in id order"""
+    stmt = select(*Payment.__table__.columns).order_by(Payment.id)
+    if payment_status:
+        stmt = stmt.filter(Payment.status == payment_status)
+    if created_from:
+        stmt = stmt.filter(Payment.created_at >= created_from)
+    if created_to:
+        stmt = stmt.filter(Payment.created_at < created_to)
+    return export_response(stmt, export_format, "payments")
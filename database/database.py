@@ -1,40 +1,45 @@
-import time
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 from settings import settings
 
 DATABASE_URL = settings.POSTGRES_URL
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart."""
+    url = make_url(url)
+    drivers = {
+        'postgresql': 'postgresql+asyncpg',
+        'postgresql+psycopg2': 'postgresql+asyncpg',
+        'sqlite': 'sqlite+aiosqlite',
+    }
+    return url.set(drivername=drivers.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+# Creating the engine does not connect; the pool opens connections on first
+# use. Schema changes are Alembic migrations, see migrations/.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
-def connect_with_retry():
-    retry_options = {
-        'retries': 5,
-        'factor': 2,
-        'min_timeout': 1,  # in seconds
-        'max_timeout': 5  # in seconds
-    }
+def dialect_insert(db: AsyncSession):
+    """``insert`` for the session's dialect, for ON CONFLICT support."""
+    return sqlite.insert if db.bind.dialect.name == "sqlite" else postgresql.insert
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 
-    for i in range(retry_options['retries']):
-        try:
-            # Try to connect to the database
-            connection = engine.connect()
-            print('Database connection established successfully.')
-            return connection
-        except Exception as err:
-            print(f"DB connection failed: {err}. Retrying in {retry_options['min_timeout']} s")
-            time.sleep(retry_options['min_timeout'])
-            retry_options['min_timeout'] = min(
-                retry_options['min_timeout'] *
-                retry_options['factor'], retry_options['max_timeout']
-            )
-
-    raise Exception(
-        'Unable to connect to the database after multiple attempts.')
-
-
-connection = connect_with_retry()
+async def ping_database():
+    """Round-trip a trivial query; raises if the database is unreachable."""
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
@@ -1,20 +1,27 @@
-from sqlalchemy import Boolean, Column, String, Float, DateTime, Integer, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, String, Float, Date, DateTime, Index, Integer, ForeignKey, Table, Text, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 from database.database import Base
-from database.database import engine
+
+# Tables and indexes are created by the Alembic revisions in migrations/;
+# run `alembic upgrade head` after changing anything here.
 
 
 class Payment(Base):
     __tablename__ = 'payments'
+    __table_args__ = (
+        # Keyset pagination order, see database/pagination.py
+        Index('ix_payments_created_at_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)
     phone = Column(String, nullable=False)
     country = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
-    status = Column(String, nullable=False)
+    status = Column(String, nullable=False, index=True)
     paymentReference = Column(String, nullable=False, unique=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -22,14 +29,18 @@ class Payment(Base):
 
 class HostingPayment(Base):
     __tablename__ = 'hosting_payments'
+    __table_args__ = (
+        Index('ix_hosting_payments_created_at_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, nullable=False)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)
     phone = Column(String, nullable=False)
     hosting_plan_id = Column(Integer, ForeignKey(
         'hosting_plans.id'), nullable=False)
-    status = Column(String, nullable=False)
+    amount = Column(Float, nullable=True)  # charged, in the currency subunit sent to Paystack
+    status = Column(String, nullable=False, index=True)
     paymentReference = Column(String, nullable=False, unique=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -60,7 +71,7 @@ class HostingPlanFeatures(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     feature = Column(String, nullable=False)
-    hosting_plan_id = Column(Integer, ForeignKey('hosting_plans.id'))
+    hosting_plan_id = Column(Integer, ForeignKey('hosting_plans.id'), index=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -79,16 +90,128 @@ class ContactForm(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
 
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Due-message scan in services/outbox.py
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sender = Column(String, nullable=False)  # which MailApi pool sends it
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    message = Column(Text, nullable=False)  # full RFC 5322 message
+    status = Column(String, nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class PaystackEvent(Base):
+    """A webhook delivery from Paystack, stored before it is applied."""
+    __tablename__ = 'paystack_events'
+    __table_args__ = (
+        # Due-event scan in services/paystack_webhooks.py
+        Index('ix_paystack_events_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_key = Column(String, nullable=False, unique=True)  # "<event>:<data.id>", dedupes redeliveries
+    event = Column(String, nullable=False)  # charge.success, refund.processed...
+    reference = Column(String, nullable=True, index=True)
+    payload = Column(Text, nullable=False)  # raw JSON body
+    status = Column(String, nullable=False, default='pending')  # pending, processed, ignored, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    processed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class IdempotencyKey(Base):
+    """A client ``Idempotency-Key`` and the response it got, see services/idempotency.py."""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        Index('ix_idempotency_keys_scope_key', 'scope', 'key', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # endpoint and caller, e.g. "payments.initialize:<owner hash>"
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)  # SHA-256 of the request body
+    status = Column(String, nullable=False, default='in_progress')  # in_progress, completed
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)  # JSON
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class PaymentRollup(Base):
+    """Per-day payment counts and totals, kept current by services/revenue.py."""
+    __tablename__ = 'payment_rollups'
+    __table_args__ = (
+        # One row per bucket; leads with day for date-range reads
+        Index('ix_payment_rollups_bucket', 'day', 'source', 'currency', 'country', 'status', 'hosting_plan_id',
+              unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)  # the payment's created_at date
+    source = Column(String, nullable=False)  # payments, hosting_payments
+    currency = Column(String, nullable=False)
+    country = Column(String, nullable=False, default='')  # '' for hosting payments
+    status = Column(String, nullable=False)  # as stored in the source table
+    hosting_plan_id = Column(Integer, nullable=False, default=0)  # 0 for payments
+    payment_count = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False, default=0)  # sum, in the currency subunit
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class ReconciliationRun(Base):
+    """One pass of services/reconciliation.py over the pending payments."""
+    __tablename__ = 'reconciliation_runs'
+    __table_args__ = (
+        # At most one run in progress across all workers
+        Index('ix_reconciliation_runs_running', 'status', unique=True,
+              postgresql_where=text("status = 'running'"), sqlite_where=text("status = 'running'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, nullable=False, default='running')  # running, completed, failed
+    payments_cursor = Column(Integer, nullable=False, default=0)  # last payments.id checked
+    hosting_payments_cursor = Column(Integer, nullable=False, default=0)
+    cutoff = Column(DateTime, nullable=False)  # only rows created before this are checked
+    checked = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    summary = Column(Text, nullable=True)  # JSON counts by Paystack status
+    last_error = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # heartbeat
+
+
 # Many-to-many relationship tab;e
 event_tag_table = Table(
     'event_tag', Base.metadata,
     Column('event_id', Integer, ForeignKey('events.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True, index=True)
 )
 
 
 class Event(Base):
     __tablename__ = 'events'
+    __table_args__ = (
+        Index('ix_events_created_at_id', 'created_at', 'id'),
+        Index('ix_events_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -102,14 +225,24 @@ class Event(Base):
     registrationLink = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    # Weighted title/tags/venue/text terms, written by services/event_search.py;
+    # always NULL on databases other than Postgres
+    search_vector = deferred(Column(TSVECTOR().with_variant(Text(), 'sqlite'), nullable=True))
 
+    # Load these explicitly (see events_controller.EVENT_LOAD_OPTIONS);
+    # implicit lazy loads would issue one query per event.
     tags = relationship('Tag', secondary=event_tag_table,
-                        back_populates='events')
-    eventImages = relationship('EventImages', back_populates='event')
+                        back_populates='events', lazy='raise_on_sql')
+    eventImages = relationship(
+        'EventImages', back_populates='event', lazy='raise_on_sql')
 
 
 class Tag(Base):
     __tablename__ = 'tags'
+    __table_args__ = (
+        Index('ix_tags_created_at_id', 'created_at', 'id'),
+        Index('ix_tags_tagName', 'tagName', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tagName = Column(String, nullable=False)
@@ -122,6 +255,11 @@ class Tag(Base):
 
 class EventImages(Base):
     __tablename__ = 'eventImages'
+    __table_args__ = (
+        Index('ix_eventImages_created_at_id', 'created_at', 'id'),
+        # Reference counts of content-addressed files, see storage/content_store.py
+        Index('ix_eventImages_imageUrl', 'imageUrl'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     imageTitle = Column(String, nullable=False)
@@ -129,9 +267,30 @@ class EventImages(Base):
     imageDescription = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-    event_id = Column(Integer, ForeignKey('events.id'))
+    event_id = Column(Integer, ForeignKey('events.id'), index=True)
 
     event = relationship('Event', back_populates='eventImages')
+    variants = relationship(
+        'EventImageVariants', back_populates='image', lazy='raise_on_sql',
+        cascade='all, delete-orphan', passive_deletes=True)
+
+
+class EventImageVariants(Base):
+    __tablename__ = 'eventImageVariants'
+
+    id = Column(Integer, primary_key=True, index=True)
+    image_id = Column(Integer, ForeignKey('eventImages.id', ondelete='CASCADE'),
+                      nullable=False, index=True)
+    label = Column(String, nullable=False)  # thumb, card, large...
+    format = Column(String, nullable=False)  # webp, avif, jpeg
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    url = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    image = relationship('EventImages', back_populates='variants')
 
 
 class User(Base):
@@ -145,7 +304,3 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_admin = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
-
-
-# Create tables if they do not exist
-Base.metadata.create_all(engine)
@@ -1,16 +1,56 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from routes import router
+from controllers.health_controller import router as health_router
 import uvicorn
 from settings import settings
-from database.database import Base
-from database.database import engine
+from api.mail_api import mail_api
+from api.paystack_api import paystack_api
+from auth.hashing import password_hasher
+from cache.response_cache import response_cache
+from database.database import async_engine
+from services.health import readiness
+from services.outbox import outbox_worker
+from services.paystack_webhooks import webhook_processor
+from services.reconciliation import reconciler
+from storage.content_store import content_store
+from storage.derivatives import derivative_pipeline
+from storage.static import UploadStaticFiles
+from storage.uploads import UploadSizeLimitMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing above this runs at import: connections and directories are
+    # set up here, and the database check does not hold up startup.
+    readiness.start()
+    await content_store.open()
+    await paystack_api.open()
+    outbox_worker.start()
+    webhook_processor.start()
+    reconciler.start()
+    derivative_pipeline.start()
+    try:
+        yield
+    finally:
+        await readiness.stop()
+        await derivative_pipeline.stop()
+        await reconciler.stop()
+        await webhook_processor.stop()
+        await outbox_worker.stop()
+        await paystack_api.close()
+        await response_cache.close()
+        await mail_api.close()
+        password_hasher.close()
+        await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Middleware
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,11 +59,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create tables if they do not exist
-Base.metadata.create_all(engine)
-
 # Serving images from the 'uploads' directory
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# (check_dir=False: the directory is created in the lifespan, not at import)
+app.mount("/uploads", UploadStaticFiles(directory="uploads", check_dir=False), name="uploads")
 
 
 @app.get("/")
@@ -31,6 +69,7 @@ async def root():
     return {"message": "Online Payment API"}
 
 app.include_router(router, prefix="/api")
+app.include_router(health_router, tags=["health"])
 
 
 @app.exception_handler(HTTPException)
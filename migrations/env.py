@@ -0,0 +1,29 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from settings import settings
+from database.database import Base
+import database.schema  # noqa: F401  registers the models on Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(settings.POSTGRES_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    # Revisions inspect the live schema to stay idempotent, so there is no
+    # SQL-script (--sql) mode.
+    raise SystemExit("Offline migrations are not supported; run against a database.")
+run_migrations_online()
@@ -0,0 +1,39 @@
+"""Shared operations for revisions in migrations/versions."""
+from alembic import op
+import sqlalchemy as sa
+
+
+def index_is_valid(name: str):
+    """True/False for an existing Postgres index, None if there is none."""
+    return op.get_bind().execute(sa.text(
+        "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid"
+        " WHERE c.relname = :name"
+    ), {"name": name}).scalar()
+
+
+def create_index_concurrently(name: str, table: str, columns, unique: bool = False, **kw):
+    """Create an index without blocking writes, skipping it if it exists.
+
+    On Postgres this runs ``CREATE INDEX CONCURRENTLY`` outside the migration
+    transaction. A build that failed earlier leaves an INVALID index behind;
+    that one is dropped and rebuilt. Other databases get a plain
+    ``CREATE INDEX IF NOT EXISTS``.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True, **kw)
+        return
+    valid = index_is_valid(name)
+    if valid:
+        return
+    with op.get_context().autocommit_block():
+        if valid is False:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, **kw)
+
+
+def drop_index_concurrently(name: str, table: str):
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
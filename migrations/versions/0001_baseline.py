@@ -0,0 +1,137 @@
+"""Baseline schema
+
+The tables as they used to be created by ``Base.metadata.create_all`` at
+import. Databases that already have them are left untouched, so existing
+deployments can simply run ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-11-04 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def timestamps():
+    return [sa.Column('created_at', sa.DateTime()), sa.Column('updated_at', sa.DateTime())]
+
+
+def create_table_if_missing(name, *columns, indexes=()):
+    if sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    op.create_index(f'ix_{name}_id', name, ['id'])
+    for column, unique in indexes:
+        op.create_index(f'ix_{name}_{column}', name, [column], unique=unique)
+
+
+def upgrade() -> None:
+    create_table_if_missing(
+        'payments',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('country', sa.String(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('paymentReference', sa.String(), nullable=False, unique=True),
+        *timestamps(),
+    )
+    create_table_if_missing(
+        'hosting_plans',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('monthly_price', sa.Float(), nullable=False),
+        sa.Column('annual_price', sa.Float(), nullable=False),
+        sa.Column('subtitle', sa.String(), nullable=False),
+        *timestamps(),
+    )
+    create_table_if_missing(
+        'hosting_payments',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('full_name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('hosting_plan_id', sa.Integer(), sa.ForeignKey('hosting_plans.id'), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('paymentReference', sa.String(), nullable=False, unique=True),
+        *timestamps(),
+    )
+    create_table_if_missing(
+        'hosting_plan_features',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('feature', sa.String(), nullable=False),
+        sa.Column('hosting_plan_id', sa.Integer(), sa.ForeignKey('hosting_plans.id')),
+        *timestamps(),
+    )
+    create_table_if_missing(
+        'webGenerator_contact_form',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        *timestamps(),
+    )
+    create_table_if_missing(
+        'events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('paragraph', sa.String(), nullable=False),
+        sa.Column('image', sa.String(), nullable=False),
+        sa.Column('venue', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('eventDate', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('registrationLink', sa.String(), nullable=False),
+        *timestamps(),
+    )
+    create_table_if_missing(
+        'tags',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tagName', sa.String(), nullable=False),
+        *timestamps(),
+    )
+    if not sa.inspect(op.get_bind()).has_table('event_tag'):
+        op.create_table(
+            'event_tag',
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), primary_key=True),
+            sa.Column('tag_id', sa.Integer(), sa.ForeignKey('tags.id'), primary_key=True),
+        )
+    create_table_if_missing(
+        'eventImages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('imageTitle', sa.String(), nullable=False),
+        sa.Column('imageUrl', sa.String(), nullable=False),
+        sa.Column('imageDescription', sa.String(), nullable=False),
+        *timestamps(),
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id')),
+    )
+    create_table_if_missing(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('username', sa.String()),
+        sa.Column('email', sa.String()),
+        sa.Column('first_name', sa.String(), nullable=False),
+        sa.Column('last_name', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('is_admin', sa.Boolean()),
+        sa.Column('is_active', sa.Boolean()),
+        indexes=[('username', True), ('email', True)],
+    )
+
+
+def downgrade() -> None:
+    for name in ('users', 'eventImages', 'event_tag', 'tags', 'events', 'webGenerator_contact_form',
+                 'hosting_plan_features', 'hosting_payments', 'hosting_plans', 'payments'):
+        op.drop_table(name)
@@ -0,0 +1,66 @@
+"""Email outbox and event image variants
+
+Both tables were first created by ``create_all``, so they are only created
+here when missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-11-04 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('email_outbox'):
+        op.create_table(
+            'email_outbox',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('sender', sa.String(), nullable=False),
+            sa.Column('recipient', sa.String(), nullable=False),
+            sa.Column('subject', sa.String(), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.String()),
+            sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+            sa.Column('sent_at', sa.DateTime()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+        op.create_index('ix_email_outbox_id', 'email_outbox', ['id'])
+
+    if not inspector.has_table('eventImageVariants'):
+        op.create_table(
+            'eventImageVariants',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('image_id', sa.Integer(),
+                      sa.ForeignKey('eventImages.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('label', sa.String(), nullable=False),
+            sa.Column('format', sa.String(), nullable=False),
+            sa.Column('width', sa.Integer(), nullable=False),
+            sa.Column('height', sa.Integer(), nullable=False),
+            sa.Column('url', sa.String(), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+        op.create_index('ix_eventImageVariants_id', 'eventImageVariants', ['id'])
+        op.create_index('ix_eventImageVariants_image_id', 'eventImageVariants', ['image_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('eventImageVariants')
+    op.drop_table('email_outbox')
@@ -0,0 +1,74 @@
+"""Indexes for list filters, keyset pagination and relationship loads
+
+Built with CREATE INDEX CONCURRENTLY on Postgres, so this can run against a
+live database without locking writes on the large tables.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-11-04 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # name, table, columns, unique
+    ('ix_payments_email', 'payments', ['email'], False),
+    ('ix_payments_status', 'payments', ['status'], False),
+    ('ix_payments_created_at_id', 'payments', ['created_at', 'id'], False),
+    ('ix_hosting_payments_email', 'hosting_payments', ['email'], False),
+    ('ix_hosting_payments_status', 'hosting_payments', ['status'], False),
+    ('ix_hosting_payments_created_at_id', 'hosting_payments', ['created_at', 'id'], False),
+    ('ix_hosting_plan_features_hosting_plan_id', 'hosting_plan_features', ['hosting_plan_id'], False),
+    ('ix_events_created_at_id', 'events', ['created_at', 'id'], False),
+    ('ix_tags_tagName', 'tags', ['tagName'], True),
+    ('ix_tags_created_at_id', 'tags', ['created_at', 'id'], False),
+    ('ix_event_tag_tag_id', 'event_tag', ['tag_id'], False),
+    ('ix_eventImages_event_id', 'eventImages', ['event_id'], False),
+    ('ix_eventImages_created_at_id', 'eventImages', ['created_at', 'id'], False),
+    ('ix_eventImages_imageUrl', 'eventImages', ['imageUrl'], False),
+    ('ix_email_outbox_status_next_attempt_at', 'email_outbox', ['status', 'next_attempt_at'], False),
+]
+
+
+def merge_duplicate_tags():
+    """Point links at the lowest id per tagName and drop the other rows.
+
+    Tag names were not unique before; this has to happen before the unique
+    index can be built.
+    """
+    keep = 'SELECT MIN(id) FROM tags GROUP BY "tagName"'
+    op.execute("""
+        INSERT INTO event_tag (event_id, tag_id)
+        SELECT DISTINCT et.event_id, k.id
+        FROM event_tag et
+        JOIN tags t ON t.id = et.tag_id
+        JOIN (SELECT "tagName", MIN(id) AS id FROM tags GROUP BY "tagName") k ON k."tagName" = t."tagName"
+        WHERE t.id <> k.id
+          AND NOT EXISTS (SELECT 1 FROM event_tag x WHERE x.event_id = et.event_id AND x.tag_id = k.id)
+    """)
+    op.execute(f'DELETE FROM event_tag WHERE tag_id NOT IN ({keep})')
+    op.execute(f'DELETE FROM tags WHERE id NOT IN ({keep})')
+
+
+def upgrade() -> None:
+    # A no-op once the unique index exists
+    merge_duplicate_tags()
+
+    for name, table, columns, unique in INDEXES:
+        create_index_concurrently(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        drop_index_concurrently(name, table)
@@ -0,0 +1,51 @@
+"""Paystack webhook events
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-11-04 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # name, table, columns, unique
+    ('ix_paystack_events_id', 'paystack_events', ['id'], False),
+    ('ix_paystack_events_reference', 'paystack_events', ['reference'], False),
+    ('ix_paystack_events_status_next_attempt_at', 'paystack_events', ['status', 'next_attempt_at'], False),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'paystack_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('event_key', sa.String(), nullable=False, unique=True),
+        sa.Column('event', sa.String(), nullable=False),
+        sa.Column('reference', sa.String()),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String()),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    for name, table, columns, unique in INDEXES:
+        create_index_concurrently(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    op.drop_table('paystack_events')
@@ -0,0 +1,56 @@
+"""Payment reconciliation runs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-11-04 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # name, table, columns, unique
+    ('ix_reconciliation_runs_id', 'reconciliation_runs', ['id'], False),
+]
+
+# At most one run in progress at a time, see services/reconciliation.py
+RUNNING = sa.text("status = 'running'")
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reconciliation_runs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('payments_cursor', sa.Integer(), nullable=False),
+        sa.Column('hosting_payments_cursor', sa.Integer(), nullable=False),
+        sa.Column('cutoff', sa.DateTime(), nullable=False),
+        sa.Column('checked', sa.Integer(), nullable=False),
+        sa.Column('updated', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.Text()),
+        sa.Column('last_error', sa.String()),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('finished_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    for name, table, columns, unique in INDEXES:
+        create_index_concurrently(name, table, columns, unique=unique)
+    create_index_concurrently('ix_reconciliation_runs_running', 'reconciliation_runs', ['status'], unique=True,
+                              postgresql_where=RUNNING, sqlite_where=RUNNING)
+
+
+def downgrade() -> None:
+    op.drop_table('reconciliation_runs')
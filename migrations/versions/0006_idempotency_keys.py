@@ -0,0 +1,49 @@
+"""Idempotency keys
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-11-04 09:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # name, table, columns, unique
+    ('ix_idempotency_keys_id', 'idempotency_keys', ['id'], False),
+    ('ix_idempotency_keys_scope_key', 'idempotency_keys', ['scope', 'key'], True),
+    ('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'], False),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('request_hash', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer()),
+        sa.Column('response_body', sa.Text()),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    for name, table, columns, unique in INDEXES:
+        create_index_concurrently(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    op.drop_table('idempotency_keys')
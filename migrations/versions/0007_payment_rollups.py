@@ -0,0 +1,64 @@
+"""Payment rollups
+
+Also records the charged amount on hosting payments; existing rows get
+their plan's current annual price. Fill ``payment_rollups`` afterwards with
+``python scripts/backfill_revenue_rollups.py``.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-11-04 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # name, table, columns, unique
+    ('ix_payment_rollups_id', 'payment_rollups', ['id'], False),
+    ('ix_payment_rollups_bucket', 'payment_rollups',
+     ['day', 'source', 'currency', 'country', 'status', 'hosting_plan_id'], True),
+]
+
+# Amounts are in the currency subunit, like the ones sent to Paystack
+BACKFILL_AMOUNTS = """
+    UPDATE hosting_payments SET amount = (
+        SELECT annual_price * 100 FROM hosting_plans WHERE hosting_plans.id = hosting_payments.hosting_plan_id)
+    WHERE amount IS NULL
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('country', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('hosting_plan_id', sa.Integer(), nullable=False),
+        sa.Column('payment_count', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    for name, table, columns, unique in INDEXES:
+        create_index_concurrently(name, table, columns, unique=unique)
+
+    op.add_column('hosting_payments', sa.Column('amount', sa.Float()))
+    op.execute(BACKFILL_AMOUNTS)
+
+
+def downgrade() -> None:
+    op.drop_column('hosting_payments', 'amount')
+    op.drop_table('payment_rollups')
@@ -0,0 +1,50 @@
+"""Event search vector
+
+Adds ``events.search_vector`` for /events/search. On Postgres it is filled
+for existing events and gets a GIN index, built concurrently. Other
+databases leave it empty and search with LIKE instead.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-11-04 10:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same weights as services/event_search.search_vector
+BACKFILL = """
+    UPDATE events e SET search_vector =
+        setweight(to_tsvector('english', coalesce(e.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t."tagName", ' ') FROM event_tag et JOIN tags t ON t.id = et.tag_id
+            WHERE et.event_id = e.id), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(e.venue, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(e.paragraph, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(e.description, '')), 'D')
+"""
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('search_vector', postgresql.TSVECTOR().with_variant(sa.Text(), 'sqlite'),
+                                      nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(BACKFILL)
+    create_index_concurrently('ix_events_search_vector', 'events', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_events_search_vector', 'events')
+    op.drop_column('events', 'search_vector')
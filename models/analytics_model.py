@@ -0,0 +1,22 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class RevenueBucket(BaseModel):
+    # Only the dimensions asked for in group_by are set
+    day: Optional[date] = None
+    source: Optional[str] = None
+    currency: Optional[str] = None
+    country: Optional[str] = None
+    status: Optional[str] = None
+    hosting_plan_id: Optional[int] = None
+    payment_count: int
+    amount: float  # in the currency subunit
+
+
+class RevenueReport(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    group_by: List[str]
+    buckets: List[RevenueBucket]
@@ -14,11 +14,23 @@ class EventImageCreate(EventImageBase):
     pass
 
 
+class EventImageVariantResponse(BaseModel):
+    label: str
+    format: str
+    width: int
+    height: int
+    url: str
+
+    class Config:
+        orm_mode = True
+
+
 class EventImageResponse(EventImageBase):
     id: int
     event_id: int
     created_at: datetime
     updated_at: datetime
+    variants: List[EventImageVariantResponse] = []
 
     class Config:
         orm_mode = True
@@ -76,6 +88,13 @@ class EventResponse(BaseModel):
         orm_mode = True
 
 
+class EventSearchHit(BaseModel):
+    event: EventResponse
+    rank: float
+    title_highlight: str  # HTML-escaped title with matches wrapped in <mark>
+    snippet: str  # best-matching passage of paragraph/description, same markup
+
+
 # Pydantic schema for partial updates
 class EventUpdateRequest(BaseModel):
     title: Optional[str] = None
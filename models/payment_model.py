@@ -0,0 +1,18 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class PaymentResponse(BaseModel):
+    id: int
+    name: str
+    email: str
+    phone: str
+    country: str
+    amount: float
+    status: str
+    paymentReference: str
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
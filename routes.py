@@ -5,6 +5,8 @@ from controllers.events_controller import router as event_router
 from controllers.auth_controller import router as auth_router
 from controllers.hosting_plans_controller import router as hosting_plans_router
 from controllers.hosting_payment_controller import router as hosting_payments_router
+from controllers.metrics_controller import router as metrics_router
+from controllers.analytics_controller import router as analytics_router
 
 router = APIRouter()
 
@@ -15,3 +17,5 @@ router.include_router(auth_router, prefix="/auth", tags=["auth"])
 router.include_router(hosting_plans_router, tags=["hosting plans"])
 router.include_router(hosting_payments_router,
                       prefix="/hosting-payments", tags=["hosting payments"])
+router.include_router(metrics_router, tags=["metrics"])
+router.include_router(analytics_router, prefix="/analytics", tags=["analytics"])
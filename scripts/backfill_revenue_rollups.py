@@ -0,0 +1,32 @@
+"""Rebuild the payment_rollups table behind /api/analytics from the payment tables.
+
+    python scripts/backfill_revenue_rollups.py
+
+Run once after upgrading to the revision that adds the table. Run it again
+after editing payments by hand. It is safe while the app is serving: on
+PostgreSQL, status changes wait for the rebuild and are applied on top of it.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import AsyncSessionLocal, async_engine  # noqa: E402
+from services import revenue  # noqa: E402
+
+
+async def main():
+    start = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            buckets = await revenue.rebuild(db)
+            await db.commit()
+    finally:
+        await async_engine.dispose()
+    print(f"Rebuilt {buckets} rollup buckets in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
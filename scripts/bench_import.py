@@ -0,0 +1,81 @@
+"""Measure how long a worker takes to import the app and run its startup.
+
+Each run is a fresh interpreter, as when a worker boots:
+
+    python scripts/bench_import.py              # import main, 10 runs
+    python scripts/bench_import.py --lifespan   # also run lifespan startup/shutdown
+    python scripts/bench_import.py --top 25     # more modules in the breakdown
+
+Prints min/median/max wall time plus the slowest modules from
+``python -X importtime`` for one run.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_ONLY = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+WITH_LIFESPAN = """
+import asyncio, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+started = asyncio.run(boot())
+print(imported - start, started - imported)
+"""
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def slowest_modules(stderr: str, top: int):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--lifespan", action="store_true", help="also time lifespan startup")
+    args = parser.parse_args()
+
+    code = WITH_LIFESPAN if args.lifespan else IMPORT_ONLY
+    samples = [[float(value) for value in run(code).stdout.split()] for _ in range(args.runs)]
+
+    for i, label in enumerate(["import main", "lifespan startup"][:len(samples[0])]):
+        values = [sample[i] * 1000 for sample in samples]
+        print(f"{label:<18} min {min(values):8.1f} ms  median {statistics.median(values):8.1f} ms"
+              f"  max {max(values):8.1f} ms  ({args.runs} runs)")
+
+    print("\nSlowest imports (cumulative, one run):")
+    for cumulative, name in slowest_modules(run(IMPORT_ONLY, "-X", "importtime").stderr, args.top):
+        print(f"{cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""A local stand-in for the parts of the Paystack API this app uses.
+
+    uvicorn scripts.fake_paystack:app --port 8900
+    PAYSTACK_BASE_URL=http://localhost:8900 python scripts/reconcile_payments.py
+
+Transactions live in memory. Any reference not seen before verifies as
+``abandoned``; set a status by hand with
+
+    curl -X PUT localhost:8900/_fake/transaction/<reference> \\
+         -H 'Content-Type: application/json' -d '{"status": "success", "amount": 5000}'
+
+To see how the app copes with a degraded Paystack, inject latency and
+errors into every API call:
+
+    curl -X PUT localhost:8900/_fake/faults \\
+         -H 'Content-Type: application/json' -d '{"latency": 3, "error_rate": 0.5}'
+
+``fail_next`` fails exactly that many calls, ``{}`` turns faults off again.
+"""
+import asyncio
+import random
+import uuid
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="Fake Paystack")
+
+transactions: Dict[str, dict] = {}
+
+
+class Faults(BaseModel):
+    latency: float = 0.0  # seconds added to every call
+    latency_jitter: float = 0.0  # plus up to this much at random
+    error_rate: float = 0.0  # share of calls answered with error_status
+    error_status: int = 503
+    fail_next: int = 0  # fail this many calls outright, then stop
+
+
+faults = Faults()
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/_fake"):
+        return await call_next(request)
+    delay = faults.latency + random.uniform(0, faults.latency_jitter)
+    if delay:
+        await asyncio.sleep(delay)
+    if faults.fail_next > 0 or random.random() < faults.error_rate:
+        faults.fail_next = max(faults.fail_next - 1, 0)
+        return JSONResponse(status_code=faults.error_status, content={'status': False, 'message': 'Injected fault'})
+    return await call_next(request)
+
+
+class TransactionUpdate(BaseModel):
+    status: str
+    amount: Optional[float] = None
+
+
+def _transaction(reference: str) -> dict:
+    return transactions.setdefault(reference, {
+        'id': len(transactions) + 1,
+        'reference': reference,
+        'status': 'abandoned',
+        'amount': 0,
+        'currency': 'NGN',
+    })
+
+
+@app.post("/transaction/initialize")
+async def initialize(payload: dict):
+    reference = payload.get('reference') or uuid.uuid4().hex
+    transaction = _transaction(reference)
+    transaction.update(amount=payload.get('amount', 0), email=payload.get('email'))
+    return {
+        'status': True,
+        'message': 'Authorization URL created',
+        'data': {
+            'authorization_url': f'http://localhost/fake-checkout/{reference}',
+            'access_code': reference,
+            'reference': reference,
+        },
+    }
+
+
+@app.get("/transaction/verify/{reference}")
+async def verify(reference: str):
+    return {'status': True, 'message': 'Verification successful', 'data': _transaction(reference)}
+
+
+@app.get("/transaction")
+async def list_transactions(status: Optional[str] = None, perPage: int = 50, page: int = 1):
+    rows = [t for t in transactions.values() if status is None or t['status'] == status]
+    start = (page - 1) * perPage
+    return {
+        'status': True,
+        'data': rows[start:start + perPage],
+        'meta': {'total': len(rows), 'page': page, 'perPage': perPage},
+    }
+
+
+@app.put("/_fake/transaction/{reference}")
+async def set_transaction(reference: str, update: TransactionUpdate):
+    transaction = _transaction(reference)
+    transaction['status'] = update.status
+    if update.amount is not None:
+        transaction['amount'] = update.amount
+    return transaction
+
+
+@app.get("/_fake/faults")
+async def get_faults():
+    return faults
+
+
+@app.put("/_fake/faults")
+async def set_faults(update: Faults):
+    global faults
+    faults = update
+    return faults
@@ -0,0 +1,43 @@
+"""Run one payment reconciliation pass and print its summary.
+
+    python scripts/reconcile_payments.py
+    python scripts/reconcile_payments.py --min-age 0   # include fresh payments
+
+Resumes an interrupted run if its lease has expired. Against a local
+Paystack stand-in (scripts/fake_paystack.py), set PAYSTACK_BASE_URL to it.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.paystack_api import paystack_api  # noqa: E402
+from database.database import async_engine  # noqa: E402
+from services.reconciliation import reconciler  # noqa: E402
+from settings import settings  # noqa: E402
+
+
+async def main(args):
+    if args.min_age is not None:
+        settings.RECONCILE_MIN_AGE_MINUTES = args.min_age
+    try:
+        summary = await reconciler.run()
+    finally:
+        await paystack_api.close()
+        await async_engine.dispose()
+    if summary is None:
+        print("Another reconciliation run is in progress", file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0 if summary['status'] == 'completed' else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--min-age', type=float, help="only check payments older than this many minutes")
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,191 @@
+"""Ranked full-text search over events.
+
+On Postgres each event keeps a weighted ``tsvector`` in
+``events.search_vector``:
+
+- A: title
+- B: tag names and venue
+- C: paragraph
+- D: description
+
+It is rebuilt by :func:`refresh_search_vector` whenever an event or its
+tags are written, and is covered by a GIN index. Queries use
+``websearch_to_tsquery``, so quoted phrases, ``or`` and ``-term`` work.
+Results are ranked with ``ts_rank_cd``, and ``ts_headline`` marks the
+matches.
+
+Other databases (SQLite in development) fall back to case-insensitive LIKE
+matching. Every term must occur in some field, and the rank is the same
+weighting applied to whichever fields matched. Highlighting is done in
+Python. The fallback scans the table and is only meant for small data sets.
+
+Highlights are HTML: the event text is escaped first, on both paths, and
+only the ``<mark>`` tags around matches are markup.
+
+Results are ordered by rank, then id, and paged with a keyset cursor over
+that pair.
+"""
+import base64
+import html
+import json
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Float, and_, case, cast, func, literal, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.schema import Event, Tag, event_tag_table
+
+SEARCH_CONFIG = 'english'
+
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2'
+SNIPPET_CHARS = 200
+
+# Fallback weights, mirroring the tsvector weights (ts_rank_cd's defaults)
+FIELD_WEIGHTS = {'title': 1.0, 'tags': 0.4, 'venue': 0.4, 'paragraph': 0.2, 'description': 0.1}
+
+
+def _tag_names(event_id, postgres: bool = True):
+    # string_agg is Postgres only; SQLite spells it group_concat
+    aggregate = func.string_agg if postgres else func.group_concat
+    return (
+        select(aggregate(Tag.tagName, literal(' ')))
+        .select_from(event_tag_table.join(Tag, Tag.id == event_tag_table.c.tag_id))
+        .where(event_tag_table.c.event_id == event_id)
+        .scalar_subquery()
+    )
+
+
+def search_vector():
+    """The tsvector expression stored in ``events.search_vector`` (Postgres only)."""
+    def weighted(text, weight):
+        return func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(text, '')), weight)
+
+    return (weighted(Event.title, 'A')
+            .op('||')(weighted(_tag_names(Event.id), 'B'))
+            .op('||')(weighted(Event.venue, 'B'))
+            .op('||')(weighted(Event.paragraph, 'C'))
+            .op('||')(weighted(Event.description, 'D')))
+
+
+async def refresh_search_vector(db: AsyncSession, event_id: int):
+    """Recompute one event's search vector from its current row and tags.
+
+    Call it after writing the event or its tags, before committing. Pending
+    ORM changes are flushed first so they are included.
+    """
+    if db.bind.dialect.name != 'postgresql':
+        return
+    await db.flush()
+    await db.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .values(search_vector=search_vector(), updated_at=Event.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def encode_cursor(rank: float, id: int) -> str:
+    payload = json.dumps([rank, id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(rank), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _escaped(text):
+    """SQL twin of ``html.escape(text, quote=False)``; ts_headline leaves entities intact."""
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')):
+        text = func.replace(text, char, entity)
+    return text
+
+
+def _postgres_query(q: str):
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = cast(func.ts_rank_cd(Event.search_vector, query), Float)
+    highlights = (
+        func.ts_headline(SEARCH_CONFIG, _escaped(Event.title), query,
+                         'HighlightAll=true, StartSel=<mark>, StopSel=</mark>'),
+        func.ts_headline(SEARCH_CONFIG, _escaped(Event.paragraph + literal(' ') + Event.description), query,
+                         HEADLINE_OPTIONS),
+    )
+    return Event.search_vector.op('@@')(query), rank, highlights
+
+
+def _terms(q: str) -> List[str]:
+    return re.findall(r'\w+', q.lower())[:10]
+
+
+def _fallback_query(terms: List[str]):
+    tags = func.coalesce(_tag_names(Event.id, postgres=False), '')
+    fields = {
+        'title': Event.title, 'tags': tags, 'venue': Event.venue,
+        'paragraph': Event.paragraph, 'description': Event.description,
+    }
+
+    def contains(column, term):
+        return func.lower(column).contains(term, autoescape=True)
+
+    match = and_(*[or_(*[contains(column, term) for column in fields.values()]) for term in terms])
+    rank = cast(sum(
+        case((or_(*[contains(column, term) for term in terms]), FIELD_WEIGHTS[name]), else_=0.0)
+        for name, column in fields.items()
+    ), Float)
+    return match, rank, None
+
+
+def _highlight(text: str, terms: List[str], snippet: bool = False) -> str:
+    if not terms:
+        return html.escape(text[:SNIPPET_CHARS] if snippet else text, quote=False)
+    pattern = re.compile('(' + '|'.join(re.escape(term) for term in terms) + ')', re.IGNORECASE)
+    if snippet:
+        first = pattern.search(text)
+        start = max((first.start() if first else 0) - SNIPPET_CHARS // 4, 0)
+        text = ('...' if start else '') + text[start:start + SNIPPET_CHARS]
+    # split() with a group alternates text and matches; escape both, mark the matches
+    return ''.join(
+        f'<mark>{html.escape(part, quote=False)}</mark>' if i % 2 else html.escape(part, quote=False)
+        for i, part in enumerate(pattern.split(text))
+    )
+
+
+async def search_events(db: AsyncSession, q: str, limit: int, cursor: Optional[str], load_options=()):
+    """One page of events matching ``q``, best match first.
+
+    Returns ``{"items": [{"event", "rank", "title_highlight", "snippet"}], "next_cursor"}``.
+    """
+    postgres = db.bind.dialect.name == 'postgresql'
+    terms = _terms(q)
+    if not postgres and not terms:
+        return {"items": [], "next_cursor": None}
+    match, rank, highlights = _postgres_query(q) if postgres else _fallback_query(terms)
+
+    stmt = select(Event, rank.label('rank'), *(highlights or ())).options(*load_options).filter(match)
+    if cursor:
+        after_rank, after_id = decode_cursor(cursor)
+        stmt = stmt.filter(tuple_(rank, Event.id) < (after_rank, after_id))
+    stmt = stmt.order_by(rank.desc(), Event.id.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1][0].id)
+
+    items = []
+    for row in rows:
+        event = row[0]
+        if postgres:
+            title_highlight, snippet = row[2], row[3]
+        else:
+            title_highlight = _highlight(event.title, terms)
+            snippet = _highlight(f"{event.paragraph} {event.description}", terms, snippet=True)
+        items.append({"event": event, "rank": row.rank, "title_highlight": title_highlight, "snippet": snippet})
+    return {"items": items, "next_cursor": next_cursor}
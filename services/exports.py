@@ -0,0 +1,74 @@
+"""Streaming CSV / NDJSON exports of whole tables.
+
+Rows are read through a server-side cursor, EXPORT_BATCH_SIZE at a time,
+as plain column tuples rather than ORM objects. Each batch is encoded and
+sent before the next one is fetched, so memory use is the same for a
+thousand rows or millions.
+
+The response body is produced after the endpoint has returned, when
+``get_db``'s session is already closed. The stream therefore opens its own
+session for as long as it runs.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from database.database import AsyncSessionLocal
+from settings import settings
+
+MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(names: List[str], rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if value is None else _plain(value) for value in row])
+    return buffer.getvalue()
+
+
+def _encode_ndjson(names: List[str], rows) -> str:
+    return ''.join(
+        json.dumps({name: _plain(value) for name, value in zip(names, row)}, separators=(',', ':')) + '\n'
+        for row in rows
+    )
+
+
+async def stream_rows(stmt: Select, export_format: str) -> AsyncIterator[bytes]:
+    """Yield ``stmt``'s rows encoded as ``export_format``, one chunk per batch."""
+    names = [column.name for column in stmt.selected_columns]
+    encode = _encode_csv if export_format == 'csv' else _encode_ndjson
+    if export_format == 'csv':
+        yield _encode_csv(names, [names]).encode()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield encode(names, rows).encode()
+
+
+def export_response(stmt: Select, export_format: str, name: str) -> StreamingResponse:
+    """Stream ``stmt`` as a download called ``<name>-<date>.<format>``."""
+    if export_format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {export_format}")
+    filename = f"{name}-{datetime.now():%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        stream_rows(stmt, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
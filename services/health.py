@@ -0,0 +1,69 @@
+import asyncio
+import logging
+
+from database.database import ping_database
+from services.outbox import outbox_worker
+from services.paystack_webhooks import webhook_processor
+from settings import settings
+
+
+class Readiness:
+    """Tracks whether this worker can take traffic.
+
+    Startup does not wait on the database. :meth:`start` launches a
+    background task that retries it with capped exponential backoff on the
+    event loop, so the app (and ``/healthz``) comes up straight away while
+    ``/readyz`` reports 503 until the database has answered once. After that
+    every readiness check pings it again, bounded by READINESS_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._task = None
+        self.database_ready = False
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._wait_for_database())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _wait_for_database(self):
+        delay = settings.DB_CONNECT_BACKOFF_MIN
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await asyncio.wait_for(ping_database(), settings.READINESS_TIMEOUT)
+            except Exception as e:
+                logging.warning(f"Database not reachable (attempt {attempt}): {e}. Retrying in {delay} s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.DB_CONNECT_BACKOFF_MAX)
+            else:
+                self.database_ready = True
+                logging.info("Database connection established")
+                return
+
+    async def check(self) -> dict:
+        """Run the readiness checks and return each one's status."""
+        checks = {}
+        if not self.database_ready:
+            checks['database'] = 'connecting'
+        else:
+            try:
+                await asyncio.wait_for(ping_database(), settings.READINESS_TIMEOUT)
+                checks['database'] = 'ok'
+            except Exception as e:
+                checks['database'] = f'error: {e.__class__.__name__}'
+        checks['outbox'] = 'ok' if outbox_worker.stats()['running'] else 'stopped'
+        checks['paystack_webhooks'] = 'ok' if webhook_processor.stats()['running'] else 'stopped'
+        return checks
+
+
+readiness = Readiness()
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from cache.response_cache import response_cache
+from database.schema import HostingPlans
+from models.hosting_model import HostingPlanFeatureResponse, HostingPlansResponse
+from settings import settings
+
+CATALOG_TAG = "hosting_plans"
+
+
+class HostingPlanCatalog:
+    """Immutable in-memory snapshot of every hosting plan and its features.
+
+    The snapshot is built with two queries (plans, then features via
+    selectinload) and reused until the ``hosting_plans`` cache tag is bumped
+    by a write. HOSTING_PLAN_SNAPSHOT_TTL bounds how stale it can get when
+    the cache backend is per-process and another worker did the write.
+    """
+
+    def __init__(self):
+        self._plans: List[HostingPlansResponse] = []
+        self._by_id: Dict[int, HostingPlansResponse] = {}
+        self._version = None
+        self._built_at = 0.0
+        self._lock = None
+
+    async def _current_version(self) -> Optional[int]:
+        try:
+            return (await response_cache.backend.get_versions([CATALOG_TAG]))[CATALOG_TAG]
+        except Exception as e:
+            # Backend unreachable (Redis down): keep the snapshot's version,
+            # so only HOSTING_PLAN_SNAPSHOT_TTL decides when to rebuild
+            logging.error(f"Hosting plan catalog version lookup failed: {e}")
+            return self._version
+
+    def _is_fresh(self, version: int) -> bool:
+        return (
+            self._version == version
+            and time.monotonic() - self._built_at < settings.HOSTING_PLAN_SNAPSHOT_TTL
+        )
+
+    async def _snapshot(self, db: AsyncSession):
+        version = await self._current_version()
+        if self._is_fresh(version):
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_fresh(version):
+                return
+            hosting_plans = (await db.scalars(
+                select(HostingPlans)
+                .options(selectinload(HostingPlans.hosting_plan_features))
+                .order_by(HostingPlans.id)
+            )).all()
+            by_id = {
+                plan.id: HostingPlansResponse(
+                    title=plan.title,
+                    subtitle=plan.subtitle,
+                    annual_price=plan.annual_price,
+                    monthly_price=plan.monthly_price,
+                    features=[
+                        HostingPlanFeatureResponse.model_validate(feature, from_attributes=True)
+                        for feature in plan.hosting_plan_features
+                    ],
+                )
+                for plan in hosting_plans
+            }
+            self._by_id = by_id
+            self._plans = list(by_id.values())
+            self._version = version
+            self._built_at = time.monotonic()
+
+    async def get_all(self, db: AsyncSession) -> List[HostingPlansResponse]:
+        await self._snapshot(db)
+        return self._plans
+
+    async def get(self, db: AsyncSession, hosting_plan_id: int) -> Optional[HostingPlansResponse]:
+        await self._snapshot(db)
+        return self._by_id.get(hosting_plan_id)
+
+    async def invalidate(self):
+        await response_cache.invalidate(CATALOG_TAG)
+
+
+hosting_plan_catalog = HostingPlanCatalog()
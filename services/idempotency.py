@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete, select, update
+
+from database.database import AsyncSessionLocal, dialect_insert
+from database.schema import IdempotencyKey
+from settings import settings
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore:
+    """Runs a request once per ``Idempotency-Key`` and replays its response.
+
+    The first request with a key claims it by inserting an ``in_progress``
+    row, which commits straight away so every worker can see it. Its
+    response is then stored with the row. Repeats with the same key and
+    body get the stored response back, with an ``Idempotent-Replayed``
+    header, and nothing else runs. Duplicates that arrive while the first is
+    still running wait for it. Those in this worker are woken as soon as it
+    finishes; those in other workers poll the row.
+
+    Keys are scoped per endpoint and per caller (``owner``), so two callers
+    that happen to pick the same key neither see each other's response nor
+    block each other. The payment endpoints are anonymous, so the owner is
+    the payer's email: a replay can only reach a request for the same payer.
+
+    Only responses below 500 are stored. After a server error or an
+    unexpected exception the key is released, so the client's next retry
+    runs the request again. A claim left behind by a worker that died is
+    taken over after IDEMPOTENCY_LOCK_TIMEOUT. Keys expire after
+    IDEMPOTENCY_TTL and are purged from time to time.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[tuple, asyncio.Event] = {}
+        self._last_purge = 0.0
+        self._stats = {'executed': 0, 'replayed': 0, 'waited': 0, 'mismatched': 0, 'released': 0}
+
+    async def run(self, scope: str, key: Optional[str], body: bytes,
+                  handler: Callable[[], Awaitable], *, owner: str):
+        """Return ``await handler()``, or the stored response for a repeated key.
+
+        ``owner`` identifies the caller: the authenticated principal, or the
+        payer's email on anonymous endpoints.
+        """
+        if key is None:
+            return await handler()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        # Hashed so the table does not keep another copy of the email
+        scope = f"{scope}:{hashlib.sha256(owner.strip().lower().encode()).hexdigest()[:32]}"
+
+        request_hash = hashlib.sha256(body).hexdigest()
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        waited = False
+        while True:
+            entry = await self._claim(scope, key, request_hash)
+            if entry is None:
+                break
+            if entry.request_hash != request_hash:
+                self._stats['mismatched'] += 1
+                raise HTTPException(status_code=422,
+                                    detail="Idempotency-Key was already used with a different request")
+            if entry.status == 'completed':
+                self._stats['replayed'] += 1
+                return JSONResponse(status_code=entry.status_code, content=json.loads(entry.response_body),
+                                    headers={'Idempotent-Replayed': 'true'})
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(status_code=409,
+                                    detail="A request with this Idempotency-Key is still in progress")
+            if not waited:
+                waited = True
+                self._stats['waited'] += 1
+            await self._wait(scope, key, min(remaining, settings.IDEMPOTENCY_POLL_INTERVAL))
+
+        self._stats['executed'] += 1
+        waiter = self._waiters.setdefault((scope, key), asyncio.Event())
+        stored = False
+        try:
+            try:
+                result = await handler()
+            except HTTPException as e:
+                if e.status_code < 500:
+                    await self._complete(scope, key, e.status_code, {"message": e.detail})
+                    stored = True
+                raise
+            if not isinstance(result, Response):
+                await self._complete(scope, key, 200, jsonable_encoder(result))
+                stored = True
+            elif isinstance(result, JSONResponse) and result.status_code < 500:
+                await self._complete(scope, key, result.status_code, json.loads(result.body))
+                stored = True
+            return result
+        finally:
+            if not stored:
+                await asyncio.shield(self._release(scope, key))
+            self._waiters.pop((scope, key), None)
+            waiter.set()
+
+    async def _claim(self, scope: str, key: str, request_hash: str) -> Optional[IdempotencyKey]:
+        """Claim the key and return None, or return the row of whoever holds it."""
+        while True:
+            now = datetime.now()
+            async with AsyncSessionLocal() as db:
+                await self._maybe_purge(db, now)
+                claimed = await db.execute(
+                    dialect_insert(db)(IdempotencyKey)
+                    .values(scope=scope, key=key, request_hash=request_hash, status='in_progress',
+                            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+                            created_at=now, updated_at=now)
+                    .on_conflict_do_nothing(index_elements=[IdempotencyKey.scope, IdempotencyKey.key])
+                )
+                if claimed.rowcount:
+                    await db.commit()
+                    return None
+
+                entry = await db.scalar(select(IdempotencyKey).filter(
+                    IdempotencyKey.scope == scope, IdempotencyKey.key == key))
+                if entry is None:
+                    continue  # released in between
+                stale = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+                if entry.expires_at > now and (entry.status == 'completed' or entry.updated_at >= stale):
+                    return entry
+
+                # Expired, or its owner died: take it over unless someone else just did.
+                taken = await db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.id == entry.id, IdempotencyKey.updated_at == entry.updated_at)
+                    .values(request_hash=request_hash, status='in_progress', status_code=None,
+                            response_body=None, updated_at=now,
+                            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                if taken.rowcount:
+                    return None
+
+    async def _wait(self, scope: str, key: str, timeout: float):
+        waiter = self._waiters.get((scope, key))
+        if waiter is None:
+            await asyncio.sleep(timeout)  # held by another worker
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.wait()), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _complete(self, scope: str, key: str, status_code: int, body):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                .values(status='completed', status_code=status_code, response_body=json.dumps(body))
+            )
+            await db.commit()
+
+    async def _release(self, scope: str, key: str):
+        self._stats['released'] += 1
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+                    IdempotencyKey.status == 'in_progress'))
+                await db.commit()
+        except Exception as e:
+            # The claim goes stale and is taken over after IDEMPOTENCY_LOCK_TIMEOUT.
+            logging.error(f"Could not release Idempotency-Key {scope}:{key}: {e}")
+
+    async def _maybe_purge(self, db, now: datetime):
+        if time.monotonic() - self._last_purge < settings.IDEMPOTENCY_PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+        await db.commit()
+
+    def stats(self) -> dict:
+        return {**self._stats, 'in_flight': len(self._waiters)}
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from email import message_from_string, policy
+from email.message import EmailMessage
+from itertools import groupby
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.mail_api import mail_api
+from database.database import AsyncSessionLocal
+from database.schema import EmailOutbox
+from settings import settings
+
+
+def enqueue_email(db: AsyncSession, sender: str, message: EmailMessage) -> EmailOutbox:
+    """Queue a message for delivery. The caller commits it with its own work."""
+    entry = EmailOutbox(
+        sender=sender,
+        recipient=message['To'],
+        subject=message['Subject'],
+        message=message.as_string(),
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.now(),
+    )
+    db.add(entry)
+    return entry
+
+
+class OutboxWorker:
+    """Background task that drains email_outbox in batches.
+
+    Each batch is claimed with ``FOR UPDATE SKIP LOCKED`` so several app
+    workers can run side by side. Claiming marks the rows ``sending`` with a
+    lease of OUTBOX_LEASE_SECONDS and commits, so no transaction or row lock
+    is held while talking to SMTP; if the worker dies mid-batch the rows
+    become due again once the lease runs out, and that counts as a failed
+    attempt. Every sender's messages in a batch go out over one borrowed
+    SMTP connection, and the outcomes are written back in a second short
+    transaction. Failed messages are retried with jittered exponential
+    backoff and dead-lettered after OUTBOX_MAX_ATTEMPTS.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._wakeup = None
+        self._stats = {'sent': 0, 'retried': 0, 'dead': 0, 'batches': 0}
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Wake the worker after a request has committed new rows."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                drained = await self.drain_once()
+            except Exception as e:
+                logging.error(f"Outbox batch failed: {e}")
+                drained = 0
+            if drained >= settings.OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Send one batch of due messages and return how many were claimed."""
+        entries, lease_until = await self._claim()
+        if not entries:
+            return 0
+
+        for sender, group in groupby(entries, key=lambda entry: entry.sender):
+            await self._send_group(sender, list(group))
+
+        await self._record(entries, lease_until)
+        self._stats['batches'] += 1
+        return len(entries)
+
+    async def _claim(self):
+        """Lease a batch of due messages, including ones whose lease ran out."""
+        now = datetime.now()
+        lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            entries = (await db.scalars(
+                select(EmailOutbox)
+                .filter(EmailOutbox.status.in_(('pending', 'sending')), EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.sender, EmailOutbox.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            claimed = []
+            for entry in entries:
+                if entry.status == 'sending':
+                    # The last worker's lease ran out mid-send, which counts
+                    # as a failed attempt; otherwise a message that kills the
+                    # worker would be retried forever.
+                    self._mark_failed(entry, TimeoutError('Lease expired while sending'))
+                    if entry.status == 'dead':
+                        continue
+                entry.status = 'sending'
+                entry.next_attempt_at = lease_until
+                claimed.append(entry)
+            await db.commit()
+        # Detached from here on; _record writes the outcome back
+        return claimed, lease_until
+
+    async def _record(self, entries, lease_until: datetime):
+        async with AsyncSessionLocal() as db:
+            for entry in entries:
+                # Skipped if the lease ran out and another worker claimed the row since
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == entry.id, EmailOutbox.status == 'sending',
+                           EmailOutbox.next_attempt_at == lease_until)
+                    .values(status=entry.status, attempts=entry.attempts, last_error=entry.last_error,
+                            next_attempt_at=entry.next_attempt_at, sent_at=entry.sent_at)
+                )
+            await db.commit()
+
+    async def _send_group(self, sender: str, entries):
+        pool = mail_api.pool_for(sender)
+        unsent = list(entries)
+        try:
+            async with pool.connection() as connection:
+                while unsent:
+                    entry = unsent[0]
+                    try:
+                        await pool.send(message_from_string(entry.message, policy=policy.default), connection)
+                    except Exception as e:
+                        self._mark_failed(entry, e)
+                    else:
+                        self._mark_sent(entry)
+                    unsent.pop(0)
+        except Exception as e:
+            # Could not open a session at all; nothing left in the group went out.
+            for entry in unsent:
+                self._mark_failed(entry, e)
+
+    def _mark_sent(self, entry: EmailOutbox):
+        entry.status = 'sent'
+        entry.sent_at = datetime.now()
+        entry.last_error = None
+        self._stats['sent'] += 1
+
+    def _mark_failed(self, entry: EmailOutbox, error: Exception):
+        entry.attempts += 1
+        entry.last_error = str(error)[:500]
+        entry.status = 'pending'
+        if entry.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            entry.status = 'dead'
+            self._stats['dead'] += 1
+            logging.error(f"Outbox message {entry.id} dead-lettered after {entry.attempts} attempts: {error}")
+            return
+        delay = min(settings.OUTBOX_BACKOFF_BASE * 2 ** (entry.attempts - 1), settings.OUTBOX_BACKOFF_MAX)
+        entry.next_attempt_at = datetime.now() + timedelta(seconds=random.uniform(delay / 2, delay))
+        self._stats['retried'] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, 'running': self._task is not None and not self._task.done()}
+
+
+outbox_worker = OutboxWorker()
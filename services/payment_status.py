@@ -0,0 +1,115 @@
+"""The one place Paystack transaction statuses are written to our tables.
+
+Callbacks, webhooks and reconciliation all go through :func:`apply_status`,
+so they agree on what each table stores and which transitions are allowed:
+
+- ``payments`` stores its own vocabulary (``pending`` -> ``completed``);
+- ``hosting_payments`` stores Paystack's status as-is (``success``,
+  ``abandoned``, ...).
+
+Updates are conditional on the current status, so replays and races
+between a callback and a webhook are harmless: a settled payment is never
+moved back to pending or abandoned. Each change also moves the payment
+between buckets of the revenue rollups (services/revenue.py), in the same
+transaction.
+"""
+from typing import Iterable, Optional, Type, Union
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.schema import HostingPayment, Payment
+from services import revenue
+
+PaymentModel = Type[Union[Payment, HostingPayment]]
+
+# Paystack status -> value stored in payments.status
+PAYMENT_STATUSES = {
+    'success': 'completed',
+    'failed': 'failed',
+    'abandoned': 'abandoned',
+    'reversed': 'reversed',
+}
+
+# Paystack status a row may move to -> Paystack statuses it may move from
+TRANSITIONS = {
+    'success': {'pending', 'abandoned', 'failed'},
+    'failed': {'pending', 'abandoned'},
+    'abandoned': {'pending'},
+    'reversed': {'success'},
+}
+
+
+def stored_status(model: PaymentModel, paystack_status: str) -> str:
+    if model is Payment:
+        return PAYMENT_STATUSES[paystack_status]
+    return paystack_status
+
+
+async def apply_status(db: AsyncSession, model: PaymentModel, reference: str,
+                       paystack_status: str, amount: Optional[float] = None) -> bool:
+    """Move one payment to ``paystack_status`` if the transition is allowed.
+
+    ``amount`` (in the currency subunit Paystack reports) is checked against
+    ``payments.amount`` when given; a mismatch raises ValueError. Returns
+    whether a row changed. The caller commits.
+    """
+    if paystack_status not in TRANSITIONS:
+        return False
+    if amount is not None and model is Payment and paystack_status == 'success':
+        expected = await db.scalar(select(Payment.amount).filter(Payment.paymentReference == reference))
+        if expected is not None and float(expected) != float(amount):
+            raise ValueError(f"Amount mismatch for {reference}: expected {expected}, got {amount}")
+
+    return await apply_status_bulk(db, model, [reference], paystack_status) > 0
+
+
+async def apply_status_bulk(db: AsyncSession, model: PaymentModel, references: Iterable[str],
+                            paystack_status: str) -> int:
+    """Move every payment in ``references`` whose transition is allowed, in one UPDATE.
+
+    No amount check; callers that need one do it first. Returns the number
+    of rows changed. The caller commits.
+    """
+    references = list(references)
+    if paystack_status not in TRANSITIONS or not references:
+        return 0
+    allowed_from = {stored_status(model, s) if s != 'pending' else 'pending'
+                    for s in TRANSITIONS[paystack_status]}
+    new_status = stored_status(model, paystack_status)
+    # Lock the rows first: their old status decides which rollup buckets to move.
+    rows = (await db.execute(
+        select(*revenue.bucket_columns(model), model.status)
+        .where(model.paymentReference.in_(references), model.status.in_(allowed_from))
+        .with_for_update()
+    )).all()
+    if not rows:
+        return 0
+    await db.execute(
+        update(model)
+        .where(model.id.in_([row.id for row in rows]))
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    await revenue.record_transitions(db, model, rows, new_status)
+    return len(rows)
+
+
+async def apply_reference_status(db: AsyncSession, reference: str, paystack_status: str,
+                                 amount: Optional[float] = None) -> Optional[PaymentModel]:
+    """Apply a status to whichever table holds ``reference``.
+
+    Returns the model that changed, or None if neither did.
+    """
+    for model in (Payment, HostingPayment):
+        if await apply_status(db, model, reference, paystack_status, amount):
+            return model
+    return None
+
+
+async def reference_exists(db: AsyncSession, reference: str) -> bool:
+    """Whether ``payments`` or ``hosting_payments`` holds ``reference``."""
+    for model in (Payment, HostingPayment):
+        if await db.scalar(select(model.id).filter(model.paymentReference == reference)) is not None:
+            return True
+    return False
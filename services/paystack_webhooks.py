@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal, dialect_insert
+from database.schema import PaystackEvent
+from services.payment_status import apply_reference_status, reference_exists
+from settings import settings
+
+# Paystack event -> transaction status it implies. Other events are stored
+# and marked ignored.
+EVENT_STATUSES = {
+    'charge.success': 'success',
+    'refund.processed': 'reversed',
+}
+
+
+class UnknownReference(LookupError):
+    """No payment row holds the event's reference (yet).
+
+    Initialize calls Paystack before it commits the row, so a fast webhook
+    can arrive first; the event is retried like any other failure.
+    """
+
+
+def verify_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Check ``x-paystack-signature``: HMAC-SHA512 of the raw body with the secret key."""
+    if not signature:
+        return False
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def event_reference(data: dict) -> Optional[str]:
+    transaction = data.get('transaction')
+    return (data.get('reference') or data.get('transaction_reference')
+            or (transaction.get('reference') if isinstance(transaction, dict) else None))
+
+
+async def store_event(db: AsyncSession, payload: dict, body: bytes):
+    """Record a verified delivery; redeliveries of the same event are dropped.
+
+    The caller commits.
+    """
+    data = payload.get('data') or {}
+    event_id = data.get('id')
+    key = f"{payload['event']}:{event_id}" if event_id is not None else hashlib.sha256(body).hexdigest()
+    await db.execute(
+        dialect_insert(db)(PaystackEvent)
+        .values(
+            event_key=key,
+            event=payload['event'],
+            reference=event_reference(data),
+            payload=body.decode(),
+        )
+        .on_conflict_do_nothing(index_elements=[PaystackEvent.event_key])
+    )
+
+
+class WebhookProcessor:
+    """Background task that applies stored Paystack events.
+
+    The webhook endpoint only verifies and stores a delivery, so Paystack
+    gets its 200 straight away. Batches are claimed with ``FOR UPDATE SKIP
+    LOCKED`` like the email outbox, and each event is applied in its own
+    savepoint through services.payment_status. Events that keep failing,
+    including ones whose payment row does not exist yet, are retried with
+    backoff and marked dead after PAYSTACK_WEBHOOK_MAX_ATTEMPTS.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._wakeup = None
+        self._stats = {'applied': 0, 'unchanged': 0, 'ignored': 0, 'retried': 0, 'dead': 0}
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Wake the worker after a request has committed new rows."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                drained = await self.drain_once()
+            except Exception as e:
+                logging.error(f"Paystack webhook batch failed: {e}")
+                drained = 0
+            if drained >= settings.PAYSTACK_WEBHOOK_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.PAYSTACK_WEBHOOK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Apply one batch of due events and return how many were claimed."""
+        async with AsyncSessionLocal() as db:
+            events = (await db.scalars(
+                select(PaystackEvent)
+                .filter(PaystackEvent.status == 'pending', PaystackEvent.next_attempt_at <= datetime.now())
+                .order_by(PaystackEvent.id)
+                .limit(settings.PAYSTACK_WEBHOOK_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not events:
+                return 0
+
+            outcomes = []
+            for entry in events:
+                try:
+                    async with db.begin_nested():
+                        outcome = await self._apply(db, entry)
+                except Exception as e:
+                    outcomes.append(self._mark_failed(entry, e))
+                else:
+                    entry.status = 'ignored' if outcome == 'ignored' else 'processed'
+                    entry.processed_at = datetime.now()
+                    outcomes.append(outcome)
+
+            await db.commit()
+            for outcome in outcomes:
+                self._stats[outcome] += 1
+            return len(events)
+
+    @staticmethod
+    async def _apply(db: AsyncSession, entry: PaystackEvent) -> str:
+        """Apply one event: 'applied', 'unchanged' (a replay), or 'ignored' (not ours to apply).
+
+        Raises UnknownReference when no payment holds the reference.
+        """
+        paystack_status = EVENT_STATUSES.get(entry.event)
+        if paystack_status is None or entry.reference is None:
+            return 'ignored'
+        data = json.loads(entry.payload).get('data') or {}
+        amount = data.get('amount') if entry.event == 'charge.success' else None
+        if await apply_reference_status(db, entry.reference, paystack_status, amount) is not None:
+            return 'applied'
+        if not await reference_exists(db, entry.reference):
+            raise UnknownReference(f"No payment with reference {entry.reference}")
+        return 'unchanged'
+
+    @staticmethod
+    def _mark_failed(entry: PaystackEvent, error: Exception) -> str:
+        entry.attempts += 1
+        entry.last_error = str(error)[:500]
+        if isinstance(error, ValueError) or entry.attempts >= settings.PAYSTACK_WEBHOOK_MAX_ATTEMPTS:
+            # ValueError: the event contradicts our records (e.g. amount); retrying will not help.
+            entry.status = 'dead'
+            logging.error(f"Paystack event {entry.event_key} dead-lettered: {error}")
+            return 'dead'
+        delay = min(settings.PAYSTACK_WEBHOOK_POLL_INTERVAL * 2 ** entry.attempts, 3600)
+        entry.next_attempt_at = datetime.now() + timedelta(seconds=delay)
+        return 'retried'
+
+    def stats(self) -> dict:
+        return {**self._stats, 'running': self._task is not None and not self._task.done()}
+
+
+webhook_processor = WebhookProcessor()
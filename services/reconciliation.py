@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from api.paystack_api import paystack_api
+from database.database import AsyncSessionLocal
+from database.schema import HostingPayment, Payment, ReconciliationRun
+from services.payment_status import TRANSITIONS, apply_status_bulk
+from settings import settings
+
+# Tables to reconcile and the run column holding each one's cursor
+TARGETS = [
+    (Payment, 'payments_cursor'),
+    (HostingPayment, 'hosting_payments_cursor'),
+]
+
+
+class RateLimiter:
+    """Spaces out calls so no more than ``rate`` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = None
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class Reconciler:
+    """Checks pending payments against Paystack and settles them in bulk.
+
+    A run walks ``payments`` and ``hosting_payments`` in id order, one page
+    of RECONCILE_BATCH_SIZE pending rows at a time. Each page is verified
+    with at most RECONCILE_CONCURRENCY calls in flight and no more than
+    RECONCILE_RATE_PER_SECOND started per second. The resulting status
+    changes are written with one UPDATE per table and status. Rows younger
+    than RECONCILE_MIN_AGE_MINUTES are left alone: their customer may still
+    be paying.
+
+    Progress (cursors and counters) is committed with every page in
+    ``reconciliation_runs``. A run that stopped half way, or whose worker
+    died, is picked up where it left off by the next one. A unique partial
+    index keeps it to one run in progress across all workers.
+    """
+
+    def __init__(self):
+        self._task = None
+        self.last_summary = None
+
+    # Scheduling
+
+    def start(self):
+        if self._task is None and settings.RECONCILE_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                logging.error(f"Payment reconciliation failed: {e}")
+            await asyncio.sleep(settings.RECONCILE_INTERVAL)
+
+    # Runs
+
+    async def _claim_run(self) -> Optional[int]:
+        """Resume an abandoned run, start a new one, or return None if one is live."""
+        stale = datetime.now() - timedelta(seconds=settings.RECONCILE_LEASE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            run = await db.scalar(select(ReconciliationRun).filter(ReconciliationRun.status == 'running'))
+            if run is not None:
+                claimed = await db.execute(
+                    update(ReconciliationRun)
+                    .where(ReconciliationRun.id == run.id, ReconciliationRun.updated_at < stale)
+                    .values(updated_at=datetime.now())
+                )
+                await db.commit()
+                if claimed.rowcount:
+                    logging.info(f"Resuming reconciliation run {run.id}")
+                    return run.id
+                return None
+
+            run = ReconciliationRun(
+                status='running',
+                cutoff=datetime.now() - timedelta(minutes=settings.RECONCILE_MIN_AGE_MINUTES),
+                summary='{}',
+            )
+            db.add(run)
+            try:
+                await db.commit()
+            except IntegrityError:
+                return None  # another worker started one first
+            return run.id
+
+    async def run(self) -> Optional[dict]:
+        """Run (or resume) one reconciliation pass and return its summary."""
+        run_id = await self._claim_run()
+        if run_id is None:
+            logging.info("Reconciliation already running elsewhere; skipping")
+            return None
+
+        limiter = RateLimiter(settings.RECONCILE_RATE_PER_SECOND)
+        semaphore = asyncio.Semaphore(settings.RECONCILE_CONCURRENCY)
+        try:
+            for model, cursor_column in TARGETS:
+                while await self._reconcile_page(run_id, model, cursor_column, limiter, semaphore):
+                    pass
+        except Exception as e:
+            await self._finish(run_id, 'failed', str(e)[:500])
+            raise
+        return await self._finish(run_id, 'completed')
+
+    async def _reconcile_page(self, run_id: int, model, cursor_column: str,
+                              limiter: RateLimiter, semaphore: asyncio.Semaphore) -> bool:
+        async with AsyncSessionLocal() as db:
+            run = await db.get(ReconciliationRun, run_id)
+            rows = (await db.execute(
+                select(model.id, model.paymentReference, *([Payment.amount] if model is Payment else []))
+                .filter(model.status == 'pending',
+                        model.id > getattr(run, cursor_column),
+                        model.created_at <= run.cutoff)
+                .order_by(model.id)
+                .limit(settings.RECONCILE_BATCH_SIZE)
+            )).all()
+        if not rows:
+            return False
+
+        async def check(reference: str):
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    return (await paystack_api.verify_payment(reference))['data']
+                except Exception as e:
+                    logging.warning(f"Could not verify {reference}: {e}")
+                    return None
+
+        results = await asyncio.gather(*[check(row.paymentReference) for row in rows])
+
+        statuses = Counter()
+        by_status: Dict[str, List[str]] = {}
+        errors = 0
+        for row, data in zip(rows, results):
+            if data is None:
+                errors += 1
+                continue
+            paystack_status = data.get('status')
+            statuses[paystack_status] += 1
+            if model is Payment and paystack_status == 'success' and data.get('amount') is not None \
+                    and float(data['amount']) != float(row.amount):
+                logging.error(f"Amount mismatch for {row.paymentReference}: "
+                              f"expected {row.amount}, got {data['amount']}")
+                errors += 1
+                continue
+            if paystack_status in TRANSITIONS:
+                by_status.setdefault(paystack_status, []).append(row.paymentReference)
+
+        async with AsyncSessionLocal() as db:
+            changed = 0
+            for paystack_status, references in by_status.items():
+                changed += await apply_status_bulk(db, model, references, paystack_status)
+            run = await db.get(ReconciliationRun, run_id)
+            setattr(run, cursor_column, rows[-1].id)
+            run.checked += len(rows)
+            run.updated += changed
+            run.errors += errors
+            run.summary = json.dumps(dict(Counter(json.loads(run.summary or '{}')) + statuses))
+            await db.commit()
+        return len(rows) == settings.RECONCILE_BATCH_SIZE
+
+    async def _finish(self, run_id: int, status: str, error: str = None) -> dict:
+        async with AsyncSessionLocal() as db:
+            run = await db.get(ReconciliationRun, run_id)
+            run.status = status
+            run.last_error = error
+            run.finished_at = datetime.now()
+            await db.commit()
+            summary = {
+                'run_id': run.id,
+                'status': run.status,
+                'checked': run.checked,
+                'updated': run.updated,
+                'errors': run.errors,
+                'paystack_statuses': json.loads(run.summary or '{}'),
+                'started_at': run.started_at.isoformat(),
+                'finished_at': run.finished_at.isoformat(),
+            }
+        self.last_summary = summary
+        logging.info(f"Reconciliation run {run_id} {status}: {summary}")
+        return summary
+
+    def stats(self) -> dict:
+        return {
+            'scheduled': self._task is not None and not self._task.done(),
+            'last_run': self.last_summary,
+        }
+
+
+reconciler = Reconciler()
@@ -0,0 +1,123 @@
+"""Incrementally maintained payment rollups behind the analytics endpoints.
+
+``payment_rollups`` holds one row per (day, source, currency, country,
+status, hosting plan) with a count and an amount total. Totals are in the
+currency subunit, the same unit Paystack uses. Every write that creates a
+payment or changes its status moves its contribution between buckets in
+the same transaction:
+
+- new payments go through :func:`record_created`;
+- status changes go through services.payment_status, which calls
+  :func:`record_transitions` with the rows it changed.
+
+:func:`rebuild` recomputes the table from scratch. It is used for the
+initial backfill and to repair drift after manual edits to the payment
+tables.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple, Type, Union
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import dialect_insert
+from database.schema import HostingPayment, Payment, PaymentRollup
+
+PaymentModel = Type[Union[Payment, HostingPayment]]
+
+# (day, source, currency, country, status, hosting_plan_id)
+Bucket = Tuple
+BUCKET_COLUMNS = ('day', 'source', 'currency', 'country', 'status', 'hosting_plan_id')
+
+HOSTING_CURRENCY = 'KES'
+
+
+def payment_currency(country: str) -> str:
+    """Currency ``payments`` rows are charged in, see paystack_controller.initialize_payment."""
+    return 'KES' if country == 'Kenya' else 'USD'
+
+
+def bucket_columns(model: PaymentModel) -> list:
+    """Columns :func:`bucket` needs, for selecting the rows about to change."""
+    if model is Payment:
+        return [Payment.id, Payment.created_at, Payment.country, Payment.amount]
+    return [HostingPayment.id, HostingPayment.created_at, HostingPayment.hosting_plan_id, HostingPayment.amount]
+
+
+def bucket(model: PaymentModel, row, status: str) -> Tuple[Bucket, float]:
+    """The bucket a row counts towards with ``status``, and the amount it adds."""
+    day = (row.created_at or datetime.now()).date()
+    if model is Payment:
+        key = (day, Payment.__tablename__, payment_currency(row.country), row.country, status, 0)
+    else:
+        key = (day, HostingPayment.__tablename__, HOSTING_CURRENCY, '', status, row.hosting_plan_id)
+    return key, float(row.amount or 0)
+
+
+async def apply_deltas(db: AsyncSession, deltas: Dict[Bucket, List[float]]):
+    """Add ``[count, amount]`` to each bucket, creating buckets as needed. The caller commits."""
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+    insert = dialect_insert(db)
+    stmt = insert(PaymentRollup).values([
+        {**dict(zip(BUCKET_COLUMNS, key)), 'payment_count': count, 'amount': amount,
+         'updated_at': datetime.now()}
+        # Sorted, so concurrent writers lock buckets in the same order
+        for key, (count, amount) in sorted(deltas.items())
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[getattr(PaymentRollup, column) for column in BUCKET_COLUMNS],
+        set_={
+            'payment_count': PaymentRollup.payment_count + stmt.excluded.payment_count,
+            'amount': PaymentRollup.amount + stmt.excluded.amount,
+            'updated_at': stmt.excluded.updated_at,
+        },
+    ))
+
+
+async def record_created(db: AsyncSession, payment: Union[Payment, HostingPayment]):
+    """Count a payment the session is about to insert. The caller commits."""
+    await db.flush()  # fills in created_at
+    key, amount = bucket(type(payment), payment, payment.status)
+    await apply_deltas(db, {key: [1, amount]})
+
+
+async def record_transitions(db: AsyncSession, model: PaymentModel, rows: Iterable, new_status: str):
+    """Move ``rows`` (with a ``status`` column holding the old value) to ``new_status``."""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        old_key, amount = bucket(model, row, row.status)
+        new_key, _ = bucket(model, row, new_status)
+        deltas[old_key][0] -= 1
+        deltas[old_key][1] -= amount
+        deltas[new_key][0] += 1
+        deltas[new_key][1] += amount
+    await apply_deltas(db, deltas)
+
+
+async def rebuild(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Recompute every bucket from the payment tables; returns the number of buckets.
+
+    On PostgreSQL the rollup table is locked first. Status changes that
+    commit during the rebuild then wait and apply their delta on top of it,
+    instead of being counted twice or lost. The caller commits.
+    """
+    if db.bind.dialect.name == 'postgresql':
+        await db.execute(text('LOCK TABLE payment_rollups IN EXCLUSIVE MODE'))
+    await db.execute(delete(PaymentRollup))
+
+    deltas = defaultdict(lambda: [0, 0.0])
+    for model in (Payment, HostingPayment):
+        rows = await db.stream(
+            select(*bucket_columns(model), model.status).execution_options(yield_per=batch_size))
+        async for row in rows:
+            key, amount = bucket(model, row, row.status)
+            deltas[key][0] += 1
+            deltas[key][1] += amount
+
+    items = list(deltas.items())
+    for start in range(0, len(items), batch_size):
+        await apply_deltas(db, dict(items[start:start + batch_size]))
+    return len(items)
@@ -1,3 +1,4 @@
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
@@ -23,6 +24,98 @@ class Settings(BaseSettings):
     NOREPLY_PASSWORD: str
     ICT_SMTP_SERVER: str
 
+    # Outbound Paystack HTTP client
+    PAYSTACK_MAX_CONNECTIONS: int = 100
+    PAYSTACK_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PAYSTACK_KEEPALIVE_EXPIRY: float = 30.0
+    PAYSTACK_CONNECT_TIMEOUT: float = 5.0
+    PAYSTACK_READ_TIMEOUT: float = 15.0
+    PAYSTACK_HTTP2: bool = False
+    PAYSTACK_VERIFY_CACHE_TTL: float = 24 * 3600
+    PAYSTACK_VERIFY_CACHE_MAX_ENTRIES: int = 10000
+    # Per-attempt and whole-call deadlines, retries and circuit breaker (api/resilience.py)
+    PAYSTACK_ATTEMPT_TIMEOUT: float = 10.0
+    PAYSTACK_DEADLINE: float = 20.0
+    PAYSTACK_MAX_RETRIES: int = 2
+    PAYSTACK_RETRY_BACKOFF_BASE: float = 0.2
+    PAYSTACK_RETRY_BACKOFF_MAX: float = 2.0
+    PAYSTACK_RETRY_BUDGET_RATIO: float = 0.1
+    PAYSTACK_RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+    PAYSTACK_BREAKER_FAILURE_THRESHOLD: int = 5
+    PAYSTACK_BREAKER_RESET_TIMEOUT: float = 30.0
+
+    # Outbound SMTP connection pools
+    SMTP_POOL_SIZE: int = 2
+    SMTP_TIMEOUT: float = 10.0
+    SMTP_MAX_IDLE_SECONDS: float = 60.0
+    SMTP_STARTTLS: bool = True
+    SMTP_LOGIN: bool = True
+
+    # Email outbox worker
+    OUTBOX_BATCH_SIZE: int = 20
+    OUTBOX_POLL_INTERVAL: float = 5.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE: float = 30.0
+    OUTBOX_BACKOFF_MAX: float = 3600.0
+    # How long a claimed batch may take to send before another worker retries it
+    OUTBOX_LEASE_SECONDS: float = 300.0
+
+    # Paystack webhook worker
+    PAYSTACK_WEBHOOK_BATCH_SIZE: int = 50
+    PAYSTACK_WEBHOOK_POLL_INTERVAL: float = 5.0
+    PAYSTACK_WEBHOOK_MAX_ATTEMPTS: int = 8
+
+    # Idempotency-Key handling for payment initialization
+    IDEMPOTENCY_TTL: float = 24 * 3600
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 60.0
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 20.0
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.25
+    IDEMPOTENCY_PURGE_INTERVAL: float = 3600.0
+
+    # Rows fetched per batch by the streaming payment exports
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Pending payment reconciliation; an interval of 0 disables the schedule
+    RECONCILE_INTERVAL: float = 900.0
+    RECONCILE_BATCH_SIZE: int = 100
+    RECONCILE_CONCURRENCY: int = 5
+    RECONCILE_RATE_PER_SECOND: float = 10.0
+    RECONCILE_MIN_AGE_MINUTES: float = 30.0
+    RECONCILE_LEASE_SECONDS: float = 600.0
+
+    # Response cache for public catalog reads; "memory://" or a redis:// URL
+    CACHE_URL: str = "memory://"
+    CACHE_TTL_SECONDS: float = 60.0
+    CACHE_MAX_ENTRIES: int = 1024
+    HOSTING_PLAN_SNAPSHOT_TTL: float = 300.0
+
+    # Upload limits, in bytes
+    MAX_UPLOAD_FILE_BYTES: int = 10 * 1024 * 1024
+    MAX_UPLOAD_REQUEST_BYTES: int = 50 * 1024 * 1024
+
+    # Resized copies generated for every event image
+    IMAGE_VARIANT_WORKERS: int = 2
+    IMAGE_VARIANT_WIDTHS: Dict[str, int] = {"thumb": 320, "card": 640, "large": 1280}
+    IMAGE_VARIANT_FORMATS: List[str] = ["webp", "avif"]
+
+    # Resolved users behind bearer tokens
+    AUTH_CACHE_TTL: float = 60.0
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
+
+    # Password hashing: cost, dedicated threads and admission limit
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # Startup database check and /readyz
+    DB_CONNECT_BACKOFF_MIN: float = 1.0
+    DB_CONNECT_BACKOFF_MAX: float = 5.0
+    READINESS_TIMEOUT: float = 2.0
+
+    # Image id -> file path lookups for downloads
+    IMAGE_PATH_CACHE_TTL: float = 300.0
+    IMAGE_PATH_CACHE_MAX_ENTRIES: int = 10000
+
     class Config:
         env_file = './.env'
         extra = 'ignore'
@@ -0,0 +1,152 @@
+import asyncio
+import mimetypes
+import os
+import re
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Iterable
+
+import aiofiles.os
+from fastapi import UploadFile
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache.ttl_lru import TTLCache
+from database.schema import EventImages
+from storage.derivatives import derivative_pipeline
+from settings import settings
+from storage.uploads import StoredUpload, UploadBudget, remove_file, save_upload
+
+OBJECT_DIR = "uploads/objects"
+
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+# First key of the Postgres advisory locks taken on objects ("CS")
+LOCK_NAMESPACE = 0x4353
+
+
+def object_extension(upload: UploadFile) -> str:
+    ext = os.path.splitext(upload.filename or "")[1].lower()
+    if _EXTENSION.match(ext):
+        return ext
+    return mimetypes.guess_extension(upload.content_type or "") or ""
+
+
+class ContentStore:
+    """Content-addressed file store for uploaded event images.
+
+    Files live at ``uploads/objects/<aa>/<sha256><ext>``. Uploading the same
+    bytes twice yields the same path, so nothing is written twice and a file
+    never changes once it exists. That is what lets the ``/uploads`` mount
+    serve objects as immutable.
+
+    The reference count of an object is the number of EventImages rows whose
+    imageUrl points at it. Callers commit their row changes first and then
+    :meth:`release` the paths they dropped; objects nobody refers to any
+    more are deleted together with their resized variants.
+
+    A new row only counts once it is committed, so :meth:`put` claims its
+    object until the caller's transaction ends and :meth:`release` leaves
+    claimed objects alone. On Postgres the claim is a shared advisory lock
+    that release waits for exclusively, which also covers other workers.
+    Elsewhere (SQLite in development) claims are tracked in this process.
+    """
+
+    def __init__(self, directory: str = OBJECT_DIR):
+        self.directory = directory
+        self._lock = None
+        self._claims = Counter()
+
+    async def open(self):
+        """Create the store directory. Called once from the app lifespan."""
+        await aiofiles.os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, sha256: str, ext: str) -> str:
+        return os.path.join(self.directory, sha256[:2], f"{sha256}{ext}")
+
+    def owns(self, path: str) -> bool:
+        return path.startswith(self.directory + "/")
+
+    async def put(self, db: AsyncSession, upload: UploadFile, budget: UploadBudget) -> StoredUpload:
+        """Store ``upload``; its object is kept until ``db``'s transaction ends."""
+        ext = object_extension(upload)
+
+        @asynccontextmanager
+        async def claim(path):
+            if db.bind.dialect.name == 'postgresql':
+                await db.execute(select(func.pg_advisory_xact_lock_shared(*self._lock_key(path))))
+                yield
+            else:
+                async with self._local_lock():
+                    await self._claim_locally(db, path)
+                    yield
+
+        return await save_upload(
+            upload, self.directory, lambda digest: os.path.join(digest[:2], f"{digest}{ext}"), budget,
+            guard=claim)
+
+    async def discard(self, db: AsyncSession, stored: Iterable[StoredUpload]):
+        """Roll back ``db`` and drop the objects :meth:`put` stored for it that nothing else uses."""
+        await db.rollback()
+        await self.release(db, [item.path for item in stored])
+
+    async def release(self, db: AsyncSession, paths: Iterable[str]):
+        """Delete the objects in ``paths`` that no EventImages row references.
+
+        Call it with the row changes committed. Paths outside the store, or
+        claimed by an upload that has not committed yet, are left alone.
+        """
+        postgres = db.bind.dialect.name == 'postgresql'
+        for path in sorted(set(paths)):
+            if not self.owns(path):
+                continue
+            if postgres:
+                # Waits for uploads still holding the object; released by the commit below
+                await db.execute(select(func.pg_advisory_xact_lock(*self._lock_key(path))))
+                await self._remove_unreferenced(db, path)
+                await db.commit()
+            else:
+                async with self._local_lock():
+                    if not self._claims[path]:
+                        await self._remove_unreferenced(db, path)
+
+    async def _remove_unreferenced(self, db: AsyncSession, path: str):
+        references = await db.scalar(
+            select(func.count()).select_from(EventImages).filter(EventImages.imageUrl == path))
+        if not references:
+            await remove_file(path)
+            await derivative_pipeline.remove_files(path)
+
+    @staticmethod
+    def _lock_key(path: str):
+        return LOCK_NAMESPACE, func.hashtext(path)
+
+    def _local_lock(self) -> asyncio.Lock:
+        # Created lazily, inside the running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _claim_locally(self, db: AsyncSession, path: str):
+        await db.connection()  # the claim ends with this transaction
+        session = db.sync_session
+        session.info.setdefault('content_claims', []).append(path)
+        self._claims[path] += 1
+        if not event.contains(session, 'after_transaction_end', self._end_claims):
+            event.listen(session, 'after_transaction_end', self._end_claims)
+
+    def _end_claims(self, session, transaction):
+        if transaction.parent is not None:
+            return
+        for path in session.info.pop('content_claims', []):
+            self._claims[path] -= 1
+            if not self._claims[path]:
+                del self._claims[path]
+
+
+content_store = ContentStore()
+
+# EventImages.id -> imageUrl, so repeat downloads skip the database. Entries
+# are dropped here when an image is deleted or replaced; other workers fall
+# back on the TTL, or on the file being gone.
+image_path_cache = TTLCache(settings.IMAGE_PATH_CACHE_MAX_ENTRIES, settings.IMAGE_PATH_CACHE_TTL)
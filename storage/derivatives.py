@@ -0,0 +1,141 @@
+import asyncio
+import glob
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from cache.response_cache import response_cache
+import aiofiles.os
+from sqlalchemy import select
+
+from database.database import AsyncSessionLocal
+from database.schema import EventImageVariants, EventImages
+from settings import settings
+from storage.uploads import remove_file
+
+VARIANT_DIR = "uploads/objects/variants"
+
+
+class DerivativePipeline:
+    """Generates resized WebP/AVIF copies of event images off the request path.
+
+    Controllers call :meth:`schedule` after committing new EventImages rows.
+    Resizing runs in a process pool sized by IMAGE_VARIANT_WORKERS. The
+    resulting files are recorded as EventImageVariants rows and the cached
+    event responses are invalidated so the new URLs show up.
+
+    Variant files are named after the source object, so images that share a
+    content-addressed file also share its variants: if another row already
+    has them, their rows are copied instead of resizing again. Renders of
+    the same stem that overlap (identical uploads saved together) share one
+    in-flight job instead of racing on the same files.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._tasks = set()
+        self._formats = None
+        self._rendering: Dict[str, asyncio.Future] = {}
+
+    def start(self):
+        if self._executor is None:
+            # Pillow is only loaded by workers that actually start the pipeline.
+            from storage.image_variants import supported_formats
+
+            self._formats = supported_formats(settings.IMAGE_VARIANT_FORMATS)
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    async def stop(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            # Nothing is queued after the gather above; wait for the worker
+            # processes to exit off the event loop.
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, True)
+
+    def schedule(self, event_id: int, images: List[EventImages]):
+        if self._executor is None:
+            logging.warning("Image derivative pipeline not started; skipping variants")
+            return
+        for image in images:
+            task = asyncio.create_task(self._generate(event_id, image.id, image.imageUrl))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _stem(source_path: str) -> str:
+        return os.path.splitext(os.path.basename(source_path))[0]
+
+    @staticmethod
+    def _variant_dir(stem: str) -> str:
+        return os.path.join(VARIANT_DIR, stem[:2])
+
+    async def _existing_variants(self, image_id: int, source_path: str) -> List[dict]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(EventImageVariants)
+                .join(EventImages, EventImages.id == EventImageVariants.image_id)
+                .filter(EventImages.imageUrl == source_path, EventImages.id != image_id)
+                .order_by(EventImageVariants.image_id, EventImageVariants.id)
+            )).all()
+        if not rows:
+            return []
+        first = rows[0].image_id
+        return [
+            {'label': row.label, 'format': row.format, 'width': row.width,
+             'height': row.height, 'url': row.url, 'size': row.size}
+            for row in rows if row.image_id == first
+        ]
+
+    async def _render(self, source_path: str) -> List[dict]:
+        """Render ``source_path``'s variants, joining a render of the same stem already running."""
+        stem = self._stem(source_path)
+        future = self._rendering.get(stem)
+        if future is None:
+            from storage.image_variants import render_variants
+
+            future = asyncio.get_running_loop().run_in_executor(
+                self._executor, render_variants, source_path, self._variant_dir(stem), stem,
+                settings.IMAGE_VARIANT_WIDTHS, self._formats)
+            self._rendering[stem] = future
+            future.add_done_callback(lambda _: self._rendering.pop(stem, None))
+        # Shielded so one cancelled waiter does not cancel the render for the others
+        return await asyncio.shield(future)
+
+    async def _generate(self, event_id: int, image_id: int, source_path: str):
+        variants = await self._existing_variants(image_id, source_path)
+        if not variants:
+            try:
+                variants = await self._render(source_path)
+            except Exception as e:
+                logging.error(f"Could not create variants for image {image_id}: {e}")
+                return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add_all(EventImageVariants(image_id=image_id, **variant) for variant in variants)
+                await db.commit()
+        except Exception as e:
+            # Most likely the image was deleted while we were resizing it; the
+            # files stay until the source object itself is released.
+            logging.error(f"Could not record variants for image {image_id}: {e}")
+            if not await aiofiles.os.path.exists(source_path):
+                await self.remove_files(source_path)
+            return
+        await response_cache.invalidate("events", f"event:{event_id}")
+
+    async def remove_files(self, source_path: str):
+        """Delete every variant file rendered from ``source_path``."""
+        stem = self._stem(source_path)
+        pattern = os.path.join(self._variant_dir(stem), f"{glob.escape(stem)}-*")
+        for path in await asyncio.to_thread(glob.glob, pattern):
+            await remove_file(path)
+
+
+derivative_pipeline = DerivativePipeline()
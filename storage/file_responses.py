@@ -0,0 +1,96 @@
+import os
+import re
+from email.utils import parsedate
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Receive, Scope, Send
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_CONTENT_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+def content_etag(path: str):
+    """Strong ETag for content-addressed files, which are named by their SHA-256."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f'"{stem}"' if _CONTENT_NAME.match(stem) else None
+
+
+def is_not_modified(response_headers: Headers, request_headers: Headers) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent."""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = response_headers.get("etag")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag is not None and ("*" in tags or etag.removeprefix("W/") in tags)
+
+    if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+    last_modified = parsedate(response_headers.get("last-modified", ""))
+    return bool(if_modified_since and last_modified and if_modified_since >= last_modified)
+
+
+class SendfileFileResponse(FileResponse):
+    """FileResponse that hands the file to the server for zero-copy sending.
+
+    When the ASGI server advertises the ``http.response.zerocopysend``
+    extension, whole-file and single-range bodies are sent with
+    ``sendfile(2)`` by the server instead of being read into Python in
+    chunks. Otherwise, and for multipart ranges, it behaves exactly like
+    Starlette's FileResponse, which already handles ``Range``/``If-Range``.
+    """
+
+    _zerocopy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        # Starlette only compares If-Range with its own mtime-based ETag.
+        return http_if_range == self.headers.get("etag") or super()._should_use_range(http_if_range, stat_result)
+
+    async def _send_file(self, send: Send, offset: int, count: int) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            })
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if not self._zerocopy or send_header_only:
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._send_file(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if not self._zerocopy or send_header_only:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._send_file(send, start, end - start)
+
+
+def file_response(request_headers: Headers, path: str, stat_result: os.stat_result,
+                  status_code: int = 200, **kwargs) -> Response:
+    """Build a file response, or a 304 if the client's copy is current."""
+    headers = dict(kwargs.pop("headers", None) or {})
+    etag = content_etag(path)
+    if etag is not None:
+        headers.setdefault("etag", etag)
+    response = SendfileFileResponse(
+        path, status_code=status_code, stat_result=stat_result, headers=headers, **kwargs)
+    if is_not_modified(response.headers, request_headers):
+        return NotModifiedResponse(response.headers)
+    return response
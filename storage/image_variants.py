@@ -0,0 +1,77 @@
+"""Image resizing run inside the derivative process pool.
+
+Kept free of app imports so spawned worker processes start quickly.
+"""
+import os
+import uuid
+from typing import Dict, List
+
+from PIL import Image, ImageOps
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 60},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def supported_formats(formats: List[str]) -> List[str]:
+    """Drop formats this Pillow build cannot encode (AVIF needs a plugin)."""
+    if 'avif' in formats:
+        try:
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+    Image.init()
+    return [fmt for fmt in formats if fmt in SAVE_OPTIONS and SAVE_OPTIONS[fmt]['format'] in Image.SAVE]
+
+
+def render_variants(source_path: str, out_dir: str, stem: str,
+                    widths: Dict[str, int], formats: List[str]) -> List[dict]:
+    """Write a resized copy of ``source_path`` per width label and format.
+
+    Files are named ``<stem>-<width>w.<format>`` so a changed width setting
+    never reuses a name. Each file is written under a unique temporary name
+    and renamed into place, so concurrent renders of the same stem never
+    clobber each other's partial output. Images are never upscaled. Returns
+    one dict per file written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    variants = []
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        for label, width in widths.items():
+            if image.width > width:
+                resized = image.resize(
+                    (width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            else:
+                resized = image
+            for fmt in formats:
+                frame = resized.convert('RGB') if fmt == 'jpeg' else resized
+                path = os.path.join(out_dir, f'{stem}-{width}w.{fmt}')
+                tmp_path = f'{path}.{uuid.uuid4().hex}.part'
+                try:
+                    frame.save(tmp_path, **SAVE_OPTIONS[fmt])
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    _remove(tmp_path)
+                    raise
+                variants.append({
+                    'label': label,
+                    'format': fmt,
+                    'width': frame.width,
+                    'height': frame.height,
+                    'url': path,
+                    'size': os.path.getsize(path),
+                })
+    return variants
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
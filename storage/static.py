@@ -0,0 +1,40 @@
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from storage.file_responses import file_response
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles for ``/uploads`` that marks content-addressed files immutable.
+
+    Anything under ``immutable_prefix`` is named by its hash and never
+    rewritten, so browsers and proxies may keep it for a year without
+    revalidating. Other files keep the default validator-based caching.
+    Files are sent through :func:`storage.file_responses.file_response`, so
+    conditional requests, byte ranges and zero-copy sendfile apply here too.
+    """
+
+    def __init__(self, *args, immutable_prefix: str = "objects/", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefix = immutable_prefix
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        return file_response(Headers(scope=scope), full_path, stat_result, status_code=status_code)
+
+    async def get_response(self, path: str, scope: Scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304) and path.startswith(self.immutable_prefix):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
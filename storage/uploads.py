@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+from settings import settings
+
+CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+    content_type: str
+    deduplicated: bool = False
+
+
+class UploadBudget:
+    """Running byte count for all files in one request."""
+
+    def __init__(self, limit: int = None):
+        self.limit = settings.MAX_UPLOAD_REQUEST_BYTES if limit is None else limit
+        self.used = 0
+
+    def consume(self, size: int):
+        self.used += size
+        if self.used > self.limit:
+            raise HTTPException(status_code=413, detail="Upload too large")
+
+
+@asynccontextmanager
+async def _unguarded(path: str):
+    yield
+
+
+async def save_upload(upload: UploadFile, directory: str, name, budget: UploadBudget,
+                      guard=_unguarded) -> StoredUpload:
+    """Stream an upload to disk in fixed-size chunks.
+
+    The file is written to a temporary name in ``directory`` while its size
+    is checked against MAX_UPLOAD_FILE_BYTES and the request budget and its
+    SHA-256 is computed. It is then renamed into place atomically. ``name``
+    is called with the hex digest and returns the final file name, which may
+    include subdirectories. If that file already exists it is assumed to hold
+    the same bytes and the new copy is discarded.
+
+    ``guard(path)`` is an async context manager held around that check and
+    rename, so callers can keep the final file from being deleted meanwhile.
+    """
+    tmp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_FILE_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                budget.consume(len(chunk))
+                digest.update(chunk)
+                await out.write(chunk)
+
+        path = os.path.join(directory, name(digest.hexdigest()))
+        async with guard(path):
+            deduplicated = await aiofiles.os.path.exists(path)
+            if deduplicated:
+                await remove_file(tmp_path)
+            else:
+                await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+                await aiofiles.os.replace(tmp_path, path)
+    except BaseException:
+        await remove_file(tmp_path)
+        raise
+    return StoredUpload(path=path, size=size, sha256=digest.hexdigest(),
+                        content_type=upload.content_type, deduplicated=deduplicated)
+
+
+async def remove_file(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class UploadSizeLimitMiddleware:
+    """Reject multipart requests whose declared size exceeds the request budget.
+
+    This runs before the form is parsed, so oversized bodies are refused
+    without being spooled to disk. Bodies sent without a Content-Length are
+    still capped per file and per request by ``save_upload``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = dict(scope["headers"])
+            content_type = headers.get(b"content-type", b"")
+            content_length = headers.get(b"content-length")
+            if (content_type.startswith(b"multipart/") and content_length is not None
+                    and content_length.isdigit()
+                    and int(content_length) > settings.MAX_UPLOAD_REQUEST_BYTES):
+                body = json.dumps({"message": "Upload too large"}).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 413,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close"),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
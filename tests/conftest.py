@@ -0,0 +1,154 @@
+"""Shared fixtures.
+
+Tests run against a throwaway SQLite database and the in-memory response
+cache; nothing here needs Postgres, Redis, an SMTP relay or Paystack. Settings are
+read at import time, so the environment is filled in before any app
+module is imported.
+"""
+import os
+import socket
+import tempfile
+
+_DATABASE = os.path.join(tempfile.mkdtemp(prefix='payment-api-tests-'), 'test.db')
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+os.environ['POSTGRES_URL'] = f'sqlite:///{_DATABASE}'
+os.environ['CACHE_URL'] = 'memory://'
+# A local SMTP server is started on this port by the smtp_server fixture
+os.environ['SMTP_SERVER'] = os.environ['ICT_SMTP_SERVER'] = '127.0.0.1'
+os.environ['SMTP_PORT'] = str(_free_port())
+os.environ['SMTP_STARTTLS'] = os.environ['SMTP_LOGIN'] = 'false'
+for _name, _value in {
+    'POSTGRES_DB': 'test',
+    'PGADMIN_DEFAULT_EMAIL': 'admin@example.com',
+    'PGADMIN_DEFAULT_PASSWORD': 'test',
+    'APPLICATION_PORT': '8000',
+    'PAYSTACK_SECRET_KEY': 'sk_test',
+    'PAYSTACK_BASE_URL': 'http://paystack.test',
+    'EMAIL_SENDER': 'sender@example.com',
+    'EMAIL_RECEIVER': 'receiver@example.com',
+    'EMAIL_PASSWORD': 'test',
+    'AUTH_SECRET_KEY': 'test-secret',
+    'CALLBACK_URL': 'http://callback.test',
+    'NOREPLY_EMAIL': 'noreply@example.com',
+    'NOREPLY_PASSWORD': 'test',
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from database.database import Base, async_engine  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+async def database():
+    """A freshly created schema, dropped again after the test."""
+    import database.schema  # noqa: F401  registers the tables
+
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    yield
+    # Pooled connections belong to this test's event loop
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(database):
+    """An HTTP client for the app, without running its lifespan."""
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+
+
+@pytest.fixture
+async def admin_headers(database):
+    """An Authorization header for a freshly created admin user."""
+    from auth.principal_cache import principal_cache
+    from auth.utils import create_access_token
+    from database.database import AsyncSessionLocal
+    from database.schema import User
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(username='admin', email='admin@example.com', first_name='Ada', last_name='Admin',
+                    hashed_password='unused', is_admin=True))
+        await db.commit()
+    # Ids are reused by the next test's schema; start with no cached principals
+    principal_cache.clear()
+    return {'Authorization': f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+
+@pytest.fixture
+async def paystack(monkeypatch):
+    """Point ``paystack_api`` at scripts/fake_paystack.py, in-process and with clean state.
+
+    Yields the fake's module: set ``transactions`` or ``faults`` on it to
+    script Paystack's answers.
+    """
+    import fake_paystack
+    from api.paystack_api import paystack_api
+    from cache.ttl_lru import TTLCache
+
+    fake_paystack.transactions.clear()
+    monkeypatch.setattr(fake_paystack, 'faults', fake_paystack.Faults())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_paystack.app),
+                                 base_url='http://paystack.test') as client:
+        monkeypatch.setattr(paystack_api, '_client', client)
+        monkeypatch.setattr(paystack_api, '_verifying', {})
+        monkeypatch.setattr(paystack_api, '_verified', TTLCache(100, 60))
+        monkeypatch.setattr(paystack_api, '_stats', dict.fromkeys(paystack_api._stats, 0))
+        yield fake_paystack
+
+
+class SmtpSink:
+    """aiosmtpd handler that keeps every message it accepts.
+
+    Set ``reply`` to answer DATA with an error instead, and ``on_message``
+    to run a callable (in the server's thread) for each message.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.reply = '250 OK'
+        self.on_message = None
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.on_message is not None:
+            self.on_message(envelope)
+        if self.reply.startswith('250'):
+            self.messages.append(envelope)
+        return self.reply
+
+
+@pytest.fixture
+async def smtp_server(monkeypatch):
+    """A local SMTP server on SMTP_PORT for ``mail_api``'s pools, with empty pools."""
+    from aiosmtpd.controller import Controller
+
+    from api.mail_api import mail_api
+    from settings import settings
+
+    for pool in (mail_api.contact_pool, mail_api.noreply_pool):
+        monkeypatch.setattr(pool, '_slots', None)
+        monkeypatch.setattr(pool, '_idle', [])
+    sink = SmtpSink()
+    controller = Controller(sink, hostname='127.0.0.1', port=settings.SMTP_PORT)
+    controller.start()
+    try:
+        yield sink
+    finally:
+        await mail_api.close()
+        controller.stop()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from auth import hashing
+from auth.utils import pwd_context
+from database.database import AsyncSessionLocal, async_engine
+from database.schema import User
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def statement_count(coro) -> tuple:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = await coro
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+
+async def test_principals_are_cached_until_the_user_changes(client, admin_headers):
+    first, first_statements = await statement_count(client.get('/api/metrics', headers=admin_headers))
+    second, second_statements = await statement_count(client.get('/api/metrics', headers=admin_headers))
+    assert (first.status_code, second.status_code) == (200, 200)
+    assert (first_statements, second_statements) == (1, 0)
+
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(User).filter(User.username == 'admin'))
+        user.is_admin = False
+        await db.commit()
+
+    assert (await client.get('/api/metrics', headers=admin_headers)).status_code == 403
+
+
+async def test_logins_upgrade_outdated_password_hashes(client):
+    async with AsyncSessionLocal() as db:
+        db.add(User(username='ada', email='ada@example.com', first_name='Ada', last_name='L',
+                    hashed_password=pwd_context.hash('secret', rounds=4)))
+        await db.commit()
+
+    response = await client.post('/api/auth/jlogin', json={'username': 'ada', 'password': 'secret'})
+    assert response.status_code == 200
+
+    async with AsyncSessionLocal() as db:
+        hashed = await db.scalar(select(User.hashed_password).filter(User.username == 'ada'))
+    assert hashed.startswith(f'$2b${settings.BCRYPT_ROUNDS}$')
+    assert pwd_context.verify('secret', hashed)
+
+
+async def test_hashing_beyond_the_pending_limit_is_refused(monkeypatch):
+    release = threading.Event()
+
+    class SlowContext:
+        def hash(self, password):
+            release.wait(5)
+            return 'hashed'
+
+    monkeypatch.setattr(hashing, 'pwd_context', SlowContext())
+    hasher = hashing.PasswordHasher(workers=1, max_pending=2)
+    try:
+        running = [asyncio.ensure_future(hasher.hash('secret')) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            await hasher.hash('secret')
+        assert error.value.status_code == 503
+
+        release.set()
+        assert await asyncio.gather(*running) == ['hashed', 'hashed']
+        assert (hasher.stats()['completed'], hasher.stats()['rejected']) == (2, 1)
+    finally:
+        release.set()
+        hasher.close()
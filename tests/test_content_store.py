@@ -0,0 +1,69 @@
+"""Stored objects are shared by identical uploads and deleted with their last reference."""
+import io
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from database.database import AsyncSessionLocal
+from storage.content_store import content_store
+from storage.uploads import UploadBudget
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'objects')
+    monkeypatch.setattr(content_store, 'directory', directory)
+    # Normally done by ContentStore.open in the app lifespan
+    os.makedirs(directory)
+    return directory
+
+
+def png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'blue').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+async def create_event(client, headers: dict, title: str) -> dict:
+    event = {
+        'title': title, 'paragraph': 'p', 'image': 'i', 'venue': 'v', 'type': 'conference',
+        'description': 'd', 'registrationLink': 'r', 'tags': [{'tagName': title}],
+        'eventImages': [{'imageUrl': '', 'imageTitle': 't', 'imageDescription': 'd'}],
+    }
+    response = await client.post('/api/event', headers=headers, data={'event': json.dumps(event)},
+                                 files={'images': ('photo.png', png(), 'image/png')})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def test_objects_are_deleted_with_their_last_reference(client, admin_headers, store_dir):
+    first = await create_event(client, admin_headers, 'First')
+    second = await create_event(client, admin_headers, 'Second')
+    [path] = {event['eventImages'][0]['imageUrl'] for event in (first, second)}
+    assert path.startswith(store_dir) and os.path.exists(path)
+
+    assert (await client.delete(f"/api/event/{first['id']}", headers=admin_headers)).status_code == 200
+    assert os.path.exists(path)
+
+    assert (await client.delete(f"/api/event/{second['id']}", headers=admin_headers)).status_code == 200
+    assert not os.path.exists(path)
+
+
+async def test_uncommitted_uploads_keep_their_object(database, store_dir):
+    from fastapi import UploadFile
+
+    async with AsyncSessionLocal() as uploading, AsyncSessionLocal() as other:
+        stored = await content_store.put(uploading, UploadFile(io.BytesIO(png()), filename='photo.png'),
+                                         UploadBudget())
+
+        # No row refers to it yet, but the upload's transaction is still open
+        await content_store.release(other, [stored.path])
+        assert os.path.exists(stored.path)
+
+        await uploading.rollback()
+        await content_store.release(other, [stored.path])
+        assert not os.path.exists(stored.path)
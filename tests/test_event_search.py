@@ -0,0 +1,23 @@
+import pytest
+
+from database.database import AsyncSessionLocal
+from database.schema import Event
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_highlights_escape_event_text(client):
+    async with AsyncSessionLocal() as db:
+        db.add(Event(
+            title='<script>alert(1)</script> Summit', paragraph='Tech & <b>more</b>', image='i',
+            venue='Nairobi', type='conference', eventDate='TBA', description='Summit talks',
+            registrationLink='r',
+        ))
+        await db.commit()
+
+    response = await client.get('/api/events/search', params={'q': 'summit'})
+
+    assert response.status_code == 200, response.text
+    [hit] = response.json()['items']
+    assert hit['title_highlight'] == '&lt;script&gt;alert(1)&lt;/script&gt; <mark>Summit</mark>'
+    assert hit['snippet'] == 'Tech &amp; &lt;b&gt;more&lt;/b&gt; <mark>Summit</mark> talks'
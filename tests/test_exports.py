@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from database.database import AsyncSessionLocal
+from database.schema import Payment
+from services.exports import stream_rows
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_payments(count: int):
+    async with AsyncSessionLocal() as db:
+        for n in range(count):
+            db.add(Payment(name=f'Payer, {n}', email=f'payer{n}@example.com', phone='0200000000', country='Ghana',
+                           amount=3900, status='completed' if n % 2 else 'pending', paymentReference=f'ref-{n}',
+                           created_at=datetime(2024, 5, 1, 12, n)))
+        await db.commit()
+
+
+async def test_rows_are_encoded_one_batch_at_a_time(database, monkeypatch):
+    monkeypatch.setattr(settings, 'EXPORT_BATCH_SIZE', 2)
+    await add_payments(5)
+
+    stmt = select(Payment.id, Payment.name).order_by(Payment.id)
+    chunks = [chunk async for chunk in stream_rows(stmt, 'csv')]
+
+    # The header, then one chunk per batch
+    assert [len(list(csv.reader(io.StringIO(chunk.decode())))) for chunk in chunks] == [1, 2, 2, 1]
+
+
+async def test_csv_export(client, admin_headers):
+    await add_payments(3)
+
+    response = await client.get('/api/paystack/payments/export', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header[:3] == ['id', 'name', 'email']
+    assert [row[1] for row in rows] == ['Payer, 0', 'Payer, 1', 'Payer, 2']
+
+
+async def test_ndjson_export_applies_filters(client, admin_headers):
+    await add_payments(4)
+
+    response = await client.get('/api/paystack/payments/export', headers=admin_headers,
+                                params={'format': 'ndjson', 'status': 'completed'})
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['paymentReference'] for row in rows] == ['ref-1', 'ref-3']
+    assert rows[0]['created_at'] == '2024-05-01T12:01:00'
+
+
+async def test_exports_require_an_admin(client):
+    assert (await client.get('/api/paystack/payments/export')).status_code == 401
+
+
+async def test_unknown_formats_are_rejected(client, admin_headers):
+    response = await client.get('/api/paystack/payments/export', headers=admin_headers, params={'format': 'xlsx'})
+
+    assert response.status_code == 400
@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+import pytest
+
+from database.database import AsyncSessionLocal
+from database.schema import Event, EventImages
+from storage.content_store import image_path_cache
+from storage.file_responses import ZEROCOPY_EXTENSION, SendfileFileResponse
+
+pytestmark = pytest.mark.anyio
+
+CONTENT = bytes(range(256)) * 4
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def stored_file(tmp_path) -> str:
+    path = str(tmp_path / f'{SHA256}.png')
+    with open(path, 'wb') as f:
+        f.write(CONTENT)
+    return path
+
+
+async def add_image(path: str) -> int:
+    async with AsyncSessionLocal() as db:
+        image = EventImages(imageUrl=path, imageTitle='t', imageDescription='d', event=Event(
+            title='e', paragraph='p', image='i', venue='v', type='conference', eventDate='TBA',
+            description='d', registrationLink='r'))
+        db.add(image)
+        await db.commit()
+        # Ids are reused across tests' databases
+        image_path_cache.pop(image.id)
+        return image.id
+
+
+async def test_downloads_carry_a_content_etag(client, stored_file):
+    url = f'/api/event-images/{await add_image(stored_file)}/file'
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    assert response.headers['etag'] == f'"{SHA256}"'
+    assert response.content == CONTENT
+
+    revalidated = await client.get(url, headers={'If-None-Match': f'"{SHA256}"'})
+    assert revalidated.status_code == 304
+
+
+async def test_downloads_resume_from_a_byte_range(client, stored_file):
+    url = f'/api/event-images/{await add_image(stored_file)}/file'
+
+    response = await client.get(url, headers={'Range': 'bytes=1000-', 'If-Range': f'"{SHA256}"'})
+    assert response.status_code == 206
+    assert response.headers['content-range'] == f'bytes 1000-1023/{len(CONTENT)}'
+    assert response.content == CONTENT[1000:]
+
+    # A changed file (different ETag) gets the whole body again
+    stale = await client.get(url, headers={'Range': 'bytes=1000-', 'If-Range': '"0"'})
+    assert stale.status_code == 200
+
+
+async def test_zero_copy_servers_are_handed_the_file(stored_file):
+    scope = {'type': 'http', 'method': 'GET', 'headers': [(b'range', b'bytes=10-19')],
+             'extensions': {ZEROCOPY_EXTENSION: {}}}
+    sent = []
+
+    async def send(message):
+        if message['type'] == ZEROCOPY_EXTENSION:
+            message = {**message, 'file': message['file'].name}
+        sent.append(message)
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    await SendfileFileResponse(stored_file, stat_result=os.stat(stored_file))(scope, receive, send)
+
+    assert sent[0]['status'] == 206
+    assert sent[1] == {'type': ZEROCOPY_EXTENSION, 'file': stored_file, 'offset': 10, 'count': 10,
+                       'more_body': False}
@@ -0,0 +1,60 @@
+import pytest
+
+from cache.response_cache import response_cache
+from database.database import AsyncSessionLocal
+from database.schema import HostingPlans
+from services.hosting_plan_catalog import HostingPlanCatalog
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_plan(title: str):
+    async with AsyncSessionLocal() as db:
+        db.add(HostingPlans(title=title, subtitle='s', monthly_price=10, annual_price=100))
+        await db.commit()
+
+
+async def test_catalog_falls_back_to_the_ttl_when_the_cache_backend_is_down(database, monkeypatch):
+    async def unreachable(tags):
+        raise ConnectionError('Connection refused')
+
+    monkeypatch.setattr(response_cache.backend, 'get_versions', unreachable)
+    catalog = HostingPlanCatalog()
+    await add_plan('Starter')
+
+    async with AsyncSessionLocal() as db:
+        assert [plan.title for plan in await catalog.get_all(db)] == ['Starter']
+
+        await add_plan('Business')
+        assert [plan.title for plan in await catalog.get_all(db)] == ['Starter']
+
+        monkeypatch.setattr(settings, 'HOSTING_PLAN_SNAPSHOT_TTL', 0)
+        assert [plan.title for plan in await catalog.get_all(db)] == ['Starter', 'Business']
+
+
+async def test_hosting_payments_are_priced_from_the_plan_row(client, paystack):
+    from services.hosting_plan_catalog import hosting_plan_catalog
+
+    await add_plan('Starter')
+    async with AsyncSessionLocal() as db:
+        await hosting_plan_catalog.get_all(db)
+        # Repriced by another worker; this process' snapshot still says 100
+        plan = await db.get(HostingPlans, 1)
+        plan.annual_price = 250
+        await db.commit()
+
+    response = await client.post('/api/hosting-payments/initialize', json={
+        'email': 'ada@example.com', 'full_name': 'Ada', 'phone': '0200000000', 'hosting_plan_id': 1})
+
+    assert response.status_code == 200
+    reference = response.json()['data']['data']['reference']
+    assert paystack.transactions[reference]['amount'] == 25000
+
+
+async def test_hosting_payments_for_unknown_plans_are_rejected(client, paystack):
+    response = await client.post('/api/hosting-payments/initialize', json={
+        'email': 'ada@example.com', 'full_name': 'Ada', 'phone': '0200000000', 'hosting_plan_id': 42})
+
+    assert response.status_code == 400
+    assert paystack.transactions == {}
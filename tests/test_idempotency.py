@@ -0,0 +1,30 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def payment(email: str) -> dict:
+    return {'email': email, 'name': 'Ada', 'phone': '0200000000', 'country': 'Ghana'}
+
+
+async def initialize(client, body: dict, key: str):
+    return await client.post('/api/paystack/initialize', json=body, headers={'Idempotency-Key': key})
+
+
+async def test_repeats_get_the_first_response(client, paystack):
+    first = await initialize(client, payment('ada@example.com'), 'key-1')
+    repeat = await initialize(client, payment('ada@example.com'), 'key-1')
+
+    assert (first.status_code, repeat.status_code) == (200, 200)
+    assert repeat.headers['Idempotent-Replayed'] == 'true'
+    assert repeat.json() == first.json()
+    assert len(paystack.transactions) == 1
+
+
+async def test_keys_are_scoped_to_the_payer(client, paystack):
+    ada = await initialize(client, payment('ada@example.com'), 'key-1')
+    grace = await initialize(client, payment('grace@example.com'), 'key-1')
+
+    assert (ada.status_code, grace.status_code) == (200, 200)
+    assert 'Idempotent-Replayed' not in grace.headers
+    assert ada.json()['data']['data']['reference'] != grace.json()['data']['data']['reference']
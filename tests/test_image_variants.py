@@ -0,0 +1,35 @@
+import os
+
+import pytest
+from PIL import Image
+
+from storage.image_variants import render_variants
+
+
+def source(tmp_path) -> str:
+    path = str(tmp_path / 'source.png')
+    Image.new('RGB', (400, 200), 'red').save(path)
+    return path
+
+
+def test_variants_are_resized_and_never_upscaled(tmp_path):
+    out_dir = str(tmp_path / 'variants')
+    variants = render_variants(source(tmp_path), out_dir, 'abc', {'sm': 200, 'lg': 800}, ['jpeg'])
+
+    assert [(v['label'], v['width'], v['height']) for v in variants] == [('sm', 200, 100), ('lg', 400, 200)]
+    assert sorted(os.listdir(out_dir)) == ['abc-200w.jpeg', 'abc-800w.jpeg']
+
+
+def test_failed_saves_leave_no_partial_files(tmp_path, monkeypatch):
+    def disk_full(self, fp, *args, **kwargs):
+        with open(fp, 'wb') as partial:
+            partial.write(b'\xff\xd8')
+        raise OSError('No space left on device')
+
+    path = source(tmp_path)
+    monkeypatch.setattr(Image.Image, 'save', disk_full)
+    out_dir = str(tmp_path / 'variants')
+
+    with pytest.raises(OSError):
+        render_variants(path, out_dir, 'abc', {'sm': 200}, ['jpeg'])
+    assert os.listdir(out_dir) == []
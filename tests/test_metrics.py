@@ -0,0 +1,14 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_metrics_require_an_admin(client):
+    assert (await client.get('/api/metrics')).status_code == 401
+
+
+async def test_metrics_for_admins(client, admin_headers):
+    response = await client.get('/api/metrics', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert 'paystack' in response.json()
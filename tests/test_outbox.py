@@ -0,0 +1,98 @@
+import sqlite3
+from datetime import datetime
+from email.message import EmailMessage
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+from database.database import AsyncSessionLocal
+from database.schema import EmailOutbox
+from services.outbox import enqueue_email, outbox_worker
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def message(n: int) -> EmailMessage:
+    message = EmailMessage()
+    message['Subject'] = f'Message {n}'
+    message['From'] = 'noreply@example.com'
+    message['To'] = f'user{n}@example.com'
+    message.set_content('hello')
+    return message
+
+
+async def enqueue(count: int):
+    async with AsyncSessionLocal() as db:
+        for n in range(count):
+            enqueue_email(db, 'noreply', message(n))
+        await db.commit()
+
+
+async def outbox() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.scalars(select(EmailOutbox).order_by(EmailOutbox.id))).all()
+
+
+async def test_claimed_batch_is_committed_before_sending(database, smtp_server):
+    await enqueue(3)
+    seen = []
+
+    def committed_statuses(envelope):
+        # A separate connection sees only committed state, and would block
+        # on SQLite's write lock if the worker still held its transaction
+        with sqlite3.connect(make_url(settings.POSTGRES_URL).database, timeout=1) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            seen.append({status for status, in connection.execute('SELECT status FROM email_outbox')})
+            connection.rollback()
+
+    smtp_server.on_message = committed_statuses
+
+    assert await outbox_worker.drain_once() == 3
+    assert seen and all('sending' in statuses for statuses in seen)
+    assert [entry.status for entry in await outbox()] == ['sent'] * 3
+    assert len(smtp_server.messages) == 3
+
+
+async def test_failed_sends_are_released_for_retry(database, smtp_server):
+    await enqueue(2)
+    smtp_server.reply = '451 Try again later'
+
+    assert await outbox_worker.drain_once() == 2
+    for entry in await outbox():
+        assert entry.status == 'pending'
+        assert entry.attempts == 1
+        assert entry.next_attempt_at > datetime.now()
+        assert '451' in entry.last_error
+    assert await outbox_worker.drain_once() == 0
+
+
+async def expire_lease(attempts: int = 0):
+    async with AsyncSessionLocal() as db:
+        entry = (await db.scalars(select(EmailOutbox))).one()
+        # A worker that claimed the message and died
+        entry.status = 'sending'
+        entry.attempts = attempts
+        entry.next_attempt_at = datetime(2000, 1, 1)
+        await db.commit()
+
+
+async def test_expired_lease_is_claimed_again(database, smtp_server):
+    await enqueue(1)
+    await expire_lease()
+
+    assert await outbox_worker.drain_once() == 1
+    [entry] = await outbox()
+    assert (entry.status, entry.attempts) == ('sent', 1)
+
+
+async def test_expired_lease_counts_towards_dead_lettering(database, smtp_server):
+    await enqueue(1)
+    await expire_lease(attempts=settings.OUTBOX_MAX_ATTEMPTS - 1)
+
+    assert await outbox_worker.drain_once() == 0
+    [entry] = await outbox()
+    assert (entry.status, entry.attempts) == ('dead', settings.OUTBOX_MAX_ATTEMPTS)
+    assert 'Lease expired' in entry.last_error
+    assert smtp_server.messages == []
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.database import AsyncSessionLocal
+from database.pagination import decode_cursor, encode_cursor
+from database.schema import Payment
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_payments(created_at: list):
+    async with AsyncSessionLocal() as db:
+        for n, created in enumerate(created_at):
+            db.add(Payment(name='Ada', email='ada@example.com', phone='0200000000', country='Ghana',
+                           amount=3900, status='pending', paymentReference=f'ref-{n}', created_at=created))
+        await db.commit()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+async def test_pages_walk_every_row_once_newest_first(client):
+    now = datetime(2024, 5, 1, 12, 0)
+    # Two rows share a timestamp, so the id has to break the tie across a page boundary
+    await add_payments([now, now + timedelta(minutes=1), now + timedelta(minutes=1), now + timedelta(minutes=2),
+                        now + timedelta(minutes=3)])
+
+    references, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        page = (await client.get('/api/paystack/payments', params=params)).json()
+        references += [item['paymentReference'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert references == ['ref-4', 'ref-3', 'ref-2', 'ref-1', 'ref-0']
+
+
+async def test_invalid_cursors_are_rejected(client):
+    response = await client.get('/api/paystack/payments', params={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == 400
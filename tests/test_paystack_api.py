@@ -0,0 +1,26 @@
+import pytest
+
+from api.paystack_api import paystack_api
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_final_verifications_are_cached(paystack):
+    paystack.transactions['ref-1'] = {'reference': 'ref-1', 'status': 'success', 'amount': 5000}
+
+    first = await paystack_api.verify_payment('ref-1')
+    paystack.transactions['ref-1']['status'] = 'reversed'
+    second = await paystack_api.verify_payment('ref-1')
+
+    assert first['data']['status'] == second['data']['status'] == 'success'
+    assert paystack_api.stats()['verify_upstream'] == 1
+
+
+async def test_abandoned_verifications_are_not_cached(paystack):
+    paystack.transactions['ref-2'] = {'reference': 'ref-2', 'status': 'abandoned', 'amount': 5000}
+
+    assert (await paystack_api.verify_payment('ref-2'))['data']['status'] == 'abandoned'
+    # The customer comes back and pays on the same reference
+    paystack.transactions['ref-2']['status'] = 'success'
+    assert (await paystack_api.verify_payment('ref-2'))['data']['status'] == 'success'
+    assert paystack_api.stats()['verify_upstream'] == 2
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from database.database import AsyncSessionLocal
+from database.schema import Payment, PaystackEvent
+from services import revenue
+from services.paystack_webhooks import webhook_processor
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_payment(reference: str, status: str = 'pending', amount: float = 3900):
+    async with AsyncSessionLocal() as db:
+        payment = Payment(name='Ada', email='ada@example.com', phone='0200000000', country='Ghana',
+                          amount=amount, status=status, paymentReference=reference)
+        db.add(payment)
+        await revenue.record_created(db, payment)
+        await db.commit()
+
+
+async def payment_status(reference: str) -> str:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(Payment.status).filter(Payment.paymentReference == reference))
+
+
+async def events() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.scalars(select(PaystackEvent).order_by(PaystackEvent.id))).all()
+
+
+async def make_due():
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(PaystackEvent).values(next_attempt_at=datetime.now()))
+        await db.commit()
+
+
+def signed(payload: dict) -> tuple:
+    body = json.dumps(payload).encode()
+    signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return body, {'x-paystack-signature': signature, 'content-type': 'application/json'}
+
+
+def charge_success(reference: str, event_id: int = 1, amount: int = 3900) -> dict:
+    return {'event': 'charge.success', 'data': {'id': event_id, 'reference': reference, 'amount': amount}}
+
+
+async def test_events_for_payments_not_committed_yet_are_retried(client):
+    body, headers = signed(charge_success('ref-1'))
+    assert (await client.post('/api/paystack/webhook', content=body, headers=headers)).status_code == 200
+
+    # Initialize has called Paystack but not committed its row yet
+    await webhook_processor.drain_once()
+    [event] = await events()
+    assert (event.status, event.attempts) == ('pending', 1)
+    assert event.next_attempt_at > datetime.now()
+
+    await add_payment('ref-1')
+    await make_due()
+    await webhook_processor.drain_once()
+
+    [event] = await events()
+    assert event.status == 'processed'
+    assert await payment_status('ref-1') == 'completed'
+
+
+async def test_events_for_unknown_payments_are_dead_lettered(client, monkeypatch):
+    monkeypatch.setattr(settings, 'PAYSTACK_WEBHOOK_MAX_ATTEMPTS', 2)
+    body, headers = signed(charge_success('ref-2'))
+    await client.post('/api/paystack/webhook', content=body, headers=headers)
+
+    await webhook_processor.drain_once()
+    await make_due()
+    await webhook_processor.drain_once()
+
+    [event] = await events()
+    assert (event.status, event.attempts) == ('dead', 2)
+
+
+async def test_only_unmapped_events_are_ignored(client):
+    await add_payment('ref-3', status='completed')
+    for payload in ({'event': 'transfer.success', 'data': {'id': 7, 'reference': 'ref-3'}},
+                    charge_success('ref-3', event_id=8)):
+        body, headers = signed(payload)
+        await client.post('/api/paystack/webhook', content=body, headers=headers)
+
+    await webhook_processor.drain_once()
+
+    assert [event.status for event in await events()] == ['ignored', 'processed']
+
+
+async def test_unsigned_and_forged_deliveries_are_rejected(client):
+    body, headers = signed(charge_success('ref-4'))
+
+    unsigned = await client.post('/api/paystack/webhook', content=body,
+                                 headers={'content-type': 'application/json'})
+    forged = await client.post('/api/paystack/webhook', content=body.replace(b'3900', b'1'), headers=headers)
+
+    assert (unsigned.status_code, forged.status_code) == (401, 401)
+    assert await events() == []
+
+
+async def test_redeliveries_are_stored_once(client):
+    await add_payment('ref-5')
+    body, headers = signed(charge_success('ref-5', event_id=9))
+    for _ in range(3):
+        assert (await client.post('/api/paystack/webhook', content=body, headers=headers)).status_code == 200
+
+    [event] = await events()
+    assert event.event_key == 'charge.success:9'
+    await webhook_processor.drain_once()
+    assert await payment_status('ref-5') == 'completed'
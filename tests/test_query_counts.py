@@ -0,0 +1,91 @@
+"""Event reads and tag writes must not issue queries per row (N+1)."""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from cache.response_cache import response_cache
+from controllers.events_controller import resolve_tags
+from database.database import AsyncSessionLocal, async_engine
+from database.schema import Event, EventImages, EventImageVariants, Tag
+
+pytestmark = pytest.mark.anyio
+
+ENDPOINTS = ['/api/events', '/api/event/{event_id}', '/api/event-images']
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+async def add_events(count: int, images_per_event: int = 3) -> int:
+    async with AsyncSessionLocal() as db:
+        for n in range(count):
+            db_event = Event(
+                title=f'Event {n}', paragraph='p', image='i', venue='v', type='conference',
+                eventDate='TBA', description='d', registrationLink='r',
+                tags=[Tag(tagName=f'tag-{n}-{t}-{id(db)}') for t in range(2)],
+            )
+            db.add(db_event)
+            for i in range(images_per_event):
+                db.add(EventImages(
+                    imageUrl=f'uploads/objects/{n}-{i}.png', imageTitle='t', imageDescription='d',
+                    event=db_event,
+                    variants=[EventImageVariants(label='thumb', format='webp', width=320, height=180,
+                                                 url=f'uploads/objects/variants/{n}-{i}-320w.webp', size=1)],
+                ))
+        await db.commit()
+        return db_event.id
+
+
+async def statements_per_endpoint(client, event_id: int) -> dict:
+    counts = {}
+    for endpoint in ENDPOINTS:
+        # Render every time instead of answering from the response cache
+        await response_cache.invalidate('events', f'event:{event_id}')
+        with count_statements() as statements:
+            response = await client.get(endpoint.format(event_id=event_id))
+        assert response.status_code == 200, response.text
+        assert response.headers.get('X-Cache') != 'HIT'
+        counts[endpoint] = len(statements)
+    return counts
+
+
+async def test_event_reads_use_a_constant_number_of_queries(client):
+    event_id = await add_events(2)
+    few = await statements_per_endpoint(client, event_id)
+
+    event_id = await add_events(20, images_per_event=5)
+    many = await statements_per_endpoint(client, event_id)
+
+    assert many == few
+    # Page query plus one selectin load per relationship
+    assert few == {'/api/events': 4, '/api/event/{event_id}': 4, '/api/event-images': 2}
+
+
+async def test_tags_are_resolved_in_bulk(database):
+    async with AsyncSessionLocal() as db:
+        await resolve_tags(db, ['python', 'ai'])
+        await db.commit()
+
+    names = ['python', 'ai', 'cloud', 'python'] + [f'new-{n}' for n in range(20)]
+    async with AsyncSessionLocal() as db:
+        with count_statements() as statements:
+            tags = await resolve_tags(db, names)
+        await db.commit()
+
+    # Existing tags, one INSERT for the missing ones, then read those back
+    assert len(statements) == 3
+    assert [tag.tagName for tag in tags] == list(dict.fromkeys(names))
+    assert len({tag.id for tag in tags}) == len(tags)
+    assert tags[0].id == 1
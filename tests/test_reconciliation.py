@@ -0,0 +1,91 @@
+"""Reconciliation runs against scripts/fake_paystack.py."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from database.database import AsyncSessionLocal
+from database.schema import HostingPayment, HostingPlans, Payment, ReconciliationRun
+from services.reconciliation import reconciler
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+AN_HOUR_AGO = datetime.now() - timedelta(hours=1)
+
+
+@pytest.fixture(autouse=True)
+def reconcile_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'RECONCILE_RATE_PER_SECOND', 0)
+    monkeypatch.setattr(settings, 'RECONCILE_BATCH_SIZE', 2)
+
+
+async def add_payments(*references, created_at=AN_HOUR_AGO):
+    async with AsyncSessionLocal() as db:
+        for reference in references:
+            db.add(Payment(name='n', email='e@example.com', phone='p', country='Kenya', amount=5000,
+                           status='pending', paymentReference=reference, created_at=created_at))
+        await db.commit()
+
+
+async def statuses(model=Payment) -> dict:
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(select(model.paymentReference, model.status))).all())
+
+
+async def test_run_settles_pending_payments(database, paystack):
+    await add_payments('paid', 'declined', 'short', 'unknown')
+    await add_payments('recent', created_at=datetime.now())
+    async with AsyncSessionLocal() as db:
+        plan = HostingPlans(title='Starter', subtitle='s', monthly_price=10, annual_price=100)
+        db.add(plan)
+        await db.flush()
+        db.add(HostingPayment(full_name='n', email='e@example.com', phone='p', hosting_plan_id=plan.id,
+                              amount=10000, status='pending', paymentReference='hosting-paid',
+                              created_at=AN_HOUR_AGO))
+        await db.commit()
+    paystack.transactions.update({
+        'paid': {'reference': 'paid', 'status': 'success', 'amount': 5000},
+        'declined': {'reference': 'declined', 'status': 'failed', 'amount': 5000},
+        'short': {'reference': 'short', 'status': 'success', 'amount': 100},
+        'recent': {'reference': 'recent', 'status': 'success', 'amount': 5000},
+        'hosting-paid': {'reference': 'hosting-paid', 'status': 'success', 'amount': 10000},
+    })
+
+    summary = await reconciler.run()
+
+    assert await statuses() == {
+        'paid': 'completed',
+        'declined': 'failed',
+        'short': 'pending',  # amount mismatch, left for a person to look at
+        'unknown': 'abandoned',  # the fake answers abandoned for references it never saw
+        'recent': 'pending',  # younger than RECONCILE_MIN_AGE_MINUTES
+    }
+    assert await statuses(HostingPayment) == {'hosting-paid': 'success'}
+    assert summary['status'] == 'completed'
+    assert (summary['checked'], summary['updated'], summary['errors']) == (5, 4, 1)
+
+
+async def test_abandoned_run_is_resumed_from_its_cursor(database, paystack):
+    await add_payments('done', 'todo')
+    async with AsyncSessionLocal() as db:
+        done_id = await db.scalar(select(Payment.id).filter(Payment.paymentReference == 'done'))
+        # A run whose worker died after the first row
+        db.add(ReconciliationRun(status='running', cutoff=datetime.now(), payments_cursor=done_id,
+                                 updated_at=datetime.now() - timedelta(hours=1)))
+        await db.commit()
+    for reference in ('done', 'todo'):
+        paystack.transactions[reference] = {'reference': reference, 'status': 'success', 'amount': 5000}
+
+    summary = await reconciler.run()
+
+    assert await statuses() == {'done': 'pending', 'todo': 'completed'}
+    assert summary['checked'] == 1
+
+
+async def test_run_is_skipped_while_another_is_live(database, paystack):
+    async with AsyncSessionLocal() as db:
+        db.add(ReconciliationRun(status='running', cutoff=datetime.now(), updated_at=datetime.now()))
+        await db.commit()
+
+    assert await reconciler.run() is None
@@ -0,0 +1,101 @@
+"""Deadlines, retries and the circuit breaker, against scripts/fake_paystack.py."""
+import asyncio
+
+import httpx
+import pytest
+
+from api.paystack_api import paystack_api
+from api.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, RetryBudget
+
+pytestmark = pytest.mark.anyio
+
+FAILING = 1000
+
+
+def caller(max_retries=2, budget=None, breaker=None, attempt_timeout=1.0, deadline=5.0) -> ResilientCaller:
+    return ResilientCaller(
+        attempt_timeout=attempt_timeout, deadline=deadline, max_retries=max_retries,
+        backoff_base=0.001, backoff_max=0.001,
+        budget=budget or RetryBudget(ratio=1.0, min_per_second=0, max_tokens=100),
+        breaker=breaker or CircuitBreaker(failure_threshold=100, reset_timeout=60),
+    )
+
+
+def upstream_calls(paystack) -> int:
+    return FAILING - paystack.faults.fail_next
+
+
+async def test_transient_errors_are_retried(paystack, monkeypatch):
+    monkeypatch.setattr(paystack_api, 'resilience', caller(max_retries=2))
+    paystack.faults.fail_next = 2
+
+    result = await paystack_api.verify_payment('ref')
+
+    assert result['data']['reference'] == 'ref'
+    assert paystack_api.resilience.stats()['failures'] == 2
+
+
+async def test_initialize_is_not_retried_once_sent(paystack, monkeypatch):
+    monkeypatch.setattr(paystack_api, 'resilience', caller(max_retries=2))
+    paystack.faults.fail_next = FAILING
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await paystack_api.initialize_payment({'email': 'a@example.com', 'amount': 5000})
+    assert upstream_calls(paystack) == 1
+
+
+async def test_retries_stop_when_the_budget_runs_out(paystack, monkeypatch):
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=3)
+    monkeypatch.setattr(paystack_api, 'resilience', caller(max_retries=2, budget=budget))
+    paystack.faults.fail_next = FAILING
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await paystack_api.verify_payment('ref-1')
+    assert upstream_calls(paystack) == 3  # first try plus two retries
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await paystack_api.verify_payment('ref-2')
+    assert upstream_calls(paystack) == 5  # one retry left in the budget
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await paystack_api.verify_payment('ref-3')
+    assert upstream_calls(paystack) == 6  # no retries at all
+    assert budget.stats()['exhausted'] == 2
+
+
+async def test_attempts_time_out(paystack, monkeypatch):
+    monkeypatch.setattr(paystack_api, 'resilience', caller(max_retries=0, attempt_timeout=0.05))
+    paystack.faults.latency = 1
+
+    with pytest.raises(asyncio.TimeoutError):
+        await paystack_api.verify_payment('ref')
+    assert paystack_api.resilience.stats()['timeouts'] == 1
+
+
+async def test_breaker_opens_and_closes_again(paystack, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    monkeypatch.setattr(paystack_api, 'resilience', caller(max_retries=0, breaker=breaker))
+    paystack.faults.fail_next = FAILING
+
+    for n in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            await paystack_api.verify_payment(f'ref-{n}')
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Open: fails fast without calling Paystack
+    with pytest.raises(CircuitOpenError):
+        await paystack_api.verify_payment('ref-3')
+    assert upstream_calls(paystack) == 3
+
+    # After reset_timeout a failed probe opens it again...
+    await asyncio.sleep(0.06)
+    with pytest.raises(httpx.HTTPStatusError):
+        await paystack_api.verify_payment('ref-4')
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # ...and a successful one closes it
+    paystack.faults.fail_next = 0
+    await asyncio.sleep(0.06)
+    assert (await paystack_api.verify_payment('ref-5'))['data']['reference'] == 'ref-5'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()['opened'] == 2
@@ -0,0 +1,68 @@
+"""Write endpoints must invalidate the cached reads they affect."""
+import pytest
+
+from cache.response_cache import response_cache
+from database.database import AsyncSessionLocal
+from database.schema import Event
+from services.hosting_plan_catalog import CATALOG_TAG
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_event(title: str) -> int:
+    async with AsyncSessionLocal() as db:
+        db_event = Event(title=title, paragraph='p', image='i', venue='v', type='conference',
+                         eventDate='TBA', description='d', registrationLink='r')
+        db.add(db_event)
+        await db.commit()
+        return db_event.id
+
+
+async def get(client, url: str, headers: dict = None):
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers['X-Cache'], response.json()
+
+
+async def test_creating_a_hosting_plan_invalidates_the_catalog(client):
+    # Entries cached by earlier tests were built from another database
+    await response_cache.invalidate(CATALOG_TAG)
+    assert await get(client, '/api/hosting_plans') == ('MISS', [])
+    assert await get(client, '/api/hosting_plans') == ('HIT', [])
+
+    response = await client.post('/api/hosting_plan', json={
+        'title': 'Starter', 'subtitle': 's', 'monthly_price': 10, 'annual_price': 100,
+        'features': [{'feature': '1 site'}]})
+    assert response.status_code == 200, response.text
+
+    cache, plans = await get(client, '/api/hosting_plans')
+    assert cache == 'MISS'
+    assert [plan['title'] for plan in plans] == ['Starter']
+
+
+async def test_updating_an_event_invalidates_it_and_the_list(client):
+    event_id = await add_event('Before')
+    await response_cache.invalidate('events', f'event:{event_id}')
+    for url in ('/api/events', f'/api/event/{event_id}'):
+        await get(client, url)
+        assert (await get(client, url))[0] == 'HIT'
+
+    response = await client.patch(f'/api/events/{event_id}', json={'title': 'After'})
+    assert response.status_code == 200, response.text
+
+    cache, page = await get(client, '/api/events')
+    assert (cache, [event['title'] for event in page['items']]) == ('MISS', ['After'])
+    cache, event = await get(client, f'/api/event/{event_id}')
+    assert (cache, event['title']) == ('MISS', 'After')
+
+
+async def test_deleting_an_event_invalidates_the_list(client, admin_headers):
+    event_id = await add_event('Doomed')
+    await response_cache.invalidate('events', f'event:{event_id}')
+    await get(client, '/api/events')
+
+    response = await client.delete(f'/api/event/{event_id}', headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    assert await get(client, '/api/events') == ('MISS', {'items': [], 'next_cursor': None})
+    assert (await client.get(f'/api/event/{event_id}')).status_code == 404
@@ -0,0 +1,62 @@
+"""Status changes move a payment's contribution between rollup buckets."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from database.database import AsyncSessionLocal
+from database.schema import Payment, PaymentRollup
+from services import revenue
+from services.payment_status import apply_status
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_payment(reference: str, country: str, amount: float):
+    async with AsyncSessionLocal() as db:
+        payment = Payment(name='Ada', email='ada@example.com', phone='0200000000', country=country,
+                          amount=amount, status='pending', paymentReference=reference,
+                          created_at=datetime(2024, 5, 1, 12))
+        db.add(payment)
+        await revenue.record_created(db, payment)
+        await db.commit()
+
+
+async def move(reference: str, paystack_status: str) -> bool:
+    async with AsyncSessionLocal() as db:
+        changed = await apply_status(db, Payment, reference, paystack_status)
+        await db.commit()
+        return changed
+
+
+async def rollups() -> dict:
+    """(currency, status) -> (count, amount), without the emptied buckets."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.scalars(select(PaymentRollup))).all()
+    return {(row.currency, row.status): (row.payment_count, row.amount) for row in rows if row.payment_count}
+
+
+async def test_transitions_move_payments_between_buckets(database):
+    await add_payment('ref-1', 'Ghana', 3900)
+    await add_payment('ref-2', 'Ghana', 3900)
+    await add_payment('ref-3', 'Kenya', 500000)
+    assert await rollups() == {('USD', 'pending'): (2, 7800), ('KES', 'pending'): (1, 500000)}
+
+    assert await move('ref-1', 'success')
+    assert await move('ref-3', 'success')
+    assert await move('ref-2', 'abandoned')
+    assert await rollups() == {
+        ('USD', 'completed'): (1, 3900), ('USD', 'abandoned'): (1, 3900), ('KES', 'completed'): (1, 500000)}
+
+    assert await move('ref-1', 'reversed')
+    # Replays and disallowed transitions change nothing
+    assert not await move('ref-3', 'success')
+    assert not await move('ref-1', 'abandoned')
+    expected = {
+        ('USD', 'reversed'): (1, 3900), ('USD', 'abandoned'): (1, 3900), ('KES', 'completed'): (1, 500000)}
+    assert await rollups() == expected
+
+    async with AsyncSessionLocal() as db:
+        await revenue.rebuild(db)
+        await db.commit()
+    assert await rollups() == expected
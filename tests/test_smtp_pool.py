@@ -0,0 +1,70 @@
+"""SmtpPool against a local aiosmtpd server."""
+import asyncio
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+
+from api.smtp_pool import SmtpPool
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def message(n: int = 0) -> EmailMessage:
+    message = EmailMessage()
+    message['Subject'] = f'Message {n}'
+    message['From'] = 'noreply@example.com'
+    message['To'] = 'user@example.com'
+    message.set_content('hello')
+    return message
+
+
+@pytest.fixture
+async def pool(smtp_server):
+    pool = SmtpPool(settings.SMTP_SERVER, settings.SMTP_PORT, size=2, start_tls=False, max_idle=60)
+    yield pool
+    await pool.close()
+
+
+async def test_sends_reuse_one_connection(pool, smtp_server):
+    for n in range(3):
+        await pool.send(message(n))
+
+    assert len(smtp_server.messages) == 3
+    assert pool.stats()['connects'] == 1
+    assert pool.stats()['idle_connections'] == 1
+
+
+async def test_concurrent_sends_are_capped_at_the_pool_size(pool, smtp_server):
+    await asyncio.gather(*[pool.send(message(n)) for n in range(6)])
+
+    assert len(smtp_server.messages) == 6
+    assert pool.stats()['connects'] == 2
+
+
+async def test_idle_connections_are_replaced(pool, smtp_server):
+    pool.max_idle = 0.05
+    await pool.send(message(1))
+    await asyncio.sleep(0.1)
+    await pool.send(message(2))
+
+    assert pool.stats()['connects'] == 2
+
+
+async def test_dropped_connection_is_reopened(pool, smtp_server):
+    async with pool.connection() as connection:
+        await pool.send(message(1), connection)
+        connection.close()  # as if the server hung up
+        await pool.send(message(2), connection)
+
+    assert len(smtp_server.messages) == 2
+    assert pool.stats()['reconnects'] == 1
+
+
+async def test_rejected_message_raises(pool, smtp_server):
+    smtp_server.reply = '554 Rejected'
+
+    with pytest.raises(aiosmtplib.SMTPResponseException):
+        await pool.send(message())
+    assert pool.stats()['failed'] == 1
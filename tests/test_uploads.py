@@ -0,0 +1,54 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from settings import settings
+from storage.uploads import CHUNK_SIZE, UploadBudget, save_upload
+
+pytestmark = pytest.mark.anyio
+
+
+def upload(size: int) -> UploadFile:
+    return UploadFile(io.BytesIO(os.urandom(size)), filename='photo.png')
+
+
+async def test_uploads_are_streamed_to_a_content_name(tmp_path):
+    data = os.urandom(CHUNK_SIZE * 2 + 10)
+
+    stored = await save_upload(UploadFile(io.BytesIO(data)), str(tmp_path), lambda digest: f'{digest}.png',
+                               UploadBudget())
+
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.size == len(data)
+    assert os.listdir(tmp_path) == [f'{stored.sha256}.png']
+
+
+async def test_oversized_files_are_rejected_without_leftovers(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_UPLOAD_FILE_BYTES', CHUNK_SIZE)
+
+    with pytest.raises(HTTPException) as error:
+        await save_upload(upload(CHUNK_SIZE + 1), str(tmp_path), lambda digest: digest, UploadBudget())
+    assert error.value.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+async def test_the_request_budget_spans_files(tmp_path):
+    budget = UploadBudget(limit=CHUNK_SIZE + 100)
+    await save_upload(upload(CHUNK_SIZE), str(tmp_path), lambda digest: digest, budget)
+
+    with pytest.raises(HTTPException) as error:
+        await save_upload(upload(200), str(tmp_path), lambda digest: digest, budget)
+    assert error.value.status_code == 413
+    assert len(os.listdir(tmp_path)) == 1
+
+
+async def test_oversized_requests_are_refused_before_parsing(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_UPLOAD_REQUEST_BYTES', 1024)
+
+    response = await client.post('/api/event', headers=admin_headers, data={'event': '{}'},
+                                 files={'images': ('photo.png', os.urandom(2048), 'image/png')})
+
+    assert response.status_code == 413